@@ -0,0 +1,41 @@
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+
+
+def content_digest(html_content):
+    """页面内容的哈希；同一份文本以str或bytes传入时分别计算（lxml对两者的编码处理不同）"""
+    if isinstance(html_content, str):
+        return 's' + hashlib.sha1(html_content.encode('utf-8', 'surrogatepass')).hexdigest()
+    return 'b' + hashlib.sha1(html_content).hexdigest()
+
+
+class AnalysisMemo:
+    """按 (页面内容哈希, 分析配置) 缓存分析结果，超过容量时淘汰最久未使用的
+
+    预处理、评分和生成XPath对同一份HTML是确定性的，同一配置再分析一次只会得到相同结果；
+    重试或换一种方式重新获取到相同页面时直接复用，不重复解析和评分。
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.lock = Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
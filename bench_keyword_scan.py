@@ -0,0 +1,58 @@
+import argparse
+import statistics
+import time
+
+from lxml import html
+
+from keyword_matcher import KEYWORD_REGISTRY, keyword_matcher
+
+
+CATEGORIES = ('header_content', 'footer_content')
+
+
+def locate_by_xpath(tree, category):
+    """原做法：每个关键词对整个文档执行一次XPath，按关键词顺序拼接结果"""
+    elements = []
+    for keyword in KEYWORD_REGISTRY[category]:
+        elements.extend(tree.xpath(f"//*[contains(text(), '{keyword}')]"))
+    return elements
+
+
+def median_time(function, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="关键词定位基准：逐关键词XPath扫描 vs 一次遍历匹配所有关键词")
+    parser.add_argument("html_files", nargs='+', help="用于测试的本地HTML文件")
+    parser.add_argument("--runs", type=int, default=5, help="每项测量的运行次数")
+    args = parser.parse_args()
+
+    total_xpath = total_single = 0
+    for path in args.html_files:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            tree = html.fromstring(f.read())
+        body = (tree.xpath('//body') or [tree])[0]
+
+        xpath_time, expected = median_time(lambda: {c: locate_by_xpath(body, c) for c in CATEGORIES}, args.runs)
+        single_time, located = median_time(lambda: keyword_matcher.locate(body, *CATEGORIES), args.runs)
+        total_xpath += xpath_time
+        total_single += single_time
+
+        same = all(len(expected[c]) == len(located[c]) and all(a is b for a, b in zip(expected[c], located[c]))
+                   for c in CATEGORIES)
+        element_count = sum(1 for _ in tree.iter())
+        print(f"{path}: {element_count} 个节点, 逐关键词XPath {xpath_time * 1000:.1f}ms, "
+              f"一次遍历 {single_time * 1000:.1f}ms, 结果{'一致' if same else '不一致'}")
+        if not same:
+            for c in CATEGORIES:
+                print(f"  {c}: XPath {len(expected[c])} 个, 一次遍历 {len(located[c])} 个")
+
+    if len(args.html_files) > 1:
+        print(f"合计: 逐关键词XPath {total_xpath * 1000:.1f}ms, 一次遍历 {total_single * 1000:.1f}ms, "
+              f"加速 {total_xpath / max(total_single, 1e-9):.1f}x")
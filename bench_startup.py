@@ -0,0 +1,65 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def time_command(command, runs):
+    """重复运行命令，返回每次从启动进程到进程退出的耗时（秒）"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def slowest_imports(top=10):
+    """用 -X importtime 找出导入xpathFake时累计耗时最多的模块"""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import xpathFake'], cwd=HERE,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="启动耗时基准：统计 xpathFake.py 从启动到完成离线分析的耗时")
+    parser.add_argument("html_file", help="用于离线分析的本地HTML文件")
+    parser.add_argument("--runs", type=int, default=5, help="每项测量的运行次数")
+    parser.add_argument("--budget", type=float, help="首次分析耗时预算（秒），中位数超过时以非0状态退出")
+    parser.add_argument("--imports", action="store_true", help="同时列出导入最慢的模块")
+    args = parser.parse_args()
+
+    html_file = os.path.abspath(args.html_file)
+    measurements = [
+        ("导入 xpathFake", [sys.executable, '-c', 'import xpathFake']),
+        ("--help", [sys.executable, 'xpathFake.py', '--help']),
+        ("首次分析 --html", [sys.executable, 'xpathFake.py', '--html', html_file, '--progress-interval', '0']),
+    ]
+    medians = {}
+    for label, command in measurements:
+        timings = time_command(command, args.runs)
+        medians[label] = statistics.median(timings)
+        print(f"{label}: 中位数 {medians[label] * 1000:.0f}ms, 最快 {min(timings) * 1000:.0f}ms, "
+              f"最慢 {max(timings) * 1000:.0f}ms ({args.runs} 次)")
+
+    if args.imports:
+        print("\n导入最慢的模块（累计耗时）:")
+        for cumulative, name in slowest_imports():
+            print(f"  {cumulative / 1000:8.1f}ms  {name}")
+
+    first_analysis = medians["首次分析 --html"]
+    if args.budget is not None and first_analysis > args.budget:
+        print(f"\n超出预算: 首次分析 {first_analysis:.2f}s > {args.budget:.2f}s")
+        sys.exit(1)
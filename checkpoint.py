@@ -0,0 +1,93 @@
+import json
+import os
+import time
+from threading import Lock
+
+from result_writer import parse_output_file
+
+
+def checkpoint_path(output_file):
+    """输出文件对应的断点文件路径"""
+    return output_file + '.ckpt'
+
+
+def entry_key(entry):
+    """断点续跑时用 name+url 匹配条目"""
+    return (entry['name'].strip(), entry['url'].strip())
+
+
+class CheckpointLog:
+    """断点文件：每完成一个条目追加一行JSON，记录其处理结果"""
+
+    def __init__(self, path, append=False, fsync_every=10, fsync_interval=5.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.lock = Lock()
+        self._pending = 0
+        self._last_sync = time.time()
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def record(self, result):
+        record = {
+            'name': result['name'],
+            'url': result['url'],
+            'status': result.get('status'),
+            'xpath': result.get('xpath'),
+            'xpathList4Click': result.get('xpathList4Click'),
+            'fingerprint': result.get('fingerprint'),
+        }
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self.lock:
+            self._file.write(line)
+            self._file.flush()
+            self._pending += 1
+            if self._pending >= self.fsync_every or time.time() - self._last_sync >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                self._pending = 0
+                self._last_sync = time.time()
+
+    def close(self):
+        with self.lock:
+            if self._file.closed:
+                return
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def load_checkpoint(path):
+    """读取断点文件，同一条目以最后一条记录为准；忽略崩溃时写坏的行"""
+    records = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            records[entry_key(record)] = record
+    return records
+
+
+def load_completed_results(output_file):
+    """从部分输出文件和断点文件中找出已经成功的条目"""
+    completed = {}
+
+    if os.path.exists(output_file):
+        for result in parse_output_file(output_file):
+            if result['status'] == 'success':
+                completed[entry_key(result)] = result
+
+    ckpt_file = checkpoint_path(output_file)
+    if os.path.exists(ckpt_file):
+        for key, record in load_checkpoint(ckpt_file).items():
+            if record.get('status') == 'success':
+                completed[key] = record
+
+    return completed
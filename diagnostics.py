@@ -0,0 +1,80 @@
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+from contextlib import contextmanager
+
+
+# 整个项目共用的日志记录器。作为库使用时不输出任何日志（NullHandler，不落到logging的stderr兜底输出），
+# 由调用方自己给'xpathfake'或根记录器配置处理器；命令行和服务启动时调用configure_logging
+logger = logging.getLogger('xpathfake')
+logger.addHandler(logging.NullHandler())
+
+_FORMAT = '%(message)s'
+_TRACE_FORMAT = '%(asctime)s %(levelname)s %(message)s'
+_UNSAFE_CHARS = re.compile(r'[\\/:*?"<>|\s]+')
+
+_current = threading.local()
+_trace_dir = None
+
+
+class EntryTraceHandler(logging.Handler):
+    """把日志写入当前线程正在处理的条目的跟踪文件（由trace_entry设置），不属于任何条目的日志忽略"""
+
+    def emit(self, record):
+        stream = getattr(_current, 'stream', None)
+        if stream is None:
+            return
+        try:
+            stream.write(self.format(record) + '\n')
+        except Exception:
+            self.handleError(record)
+
+
+def configure_logging(level=logging.INFO, trace_dir=None):
+    """配置控制台日志级别；trace_dir不为空时，每个条目的DEBUG级别日志另外写入该目录下的单独文件
+
+    调试字符串和HTML转储只在DEBUG级别开启时才构建，所以默认级别（INFO）下不产生这部分开销；
+    开启trace_dir后每个条目都会构建完整的调试信息。
+    """
+    global _trace_dir
+    logger.handlers.clear()
+    logger.propagate = False
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(level)
+    console.setFormatter(logging.Formatter(_FORMAT))
+    logger.addHandler(console)
+
+    _trace_dir = trace_dir
+    if trace_dir:
+        os.makedirs(trace_dir, exist_ok=True)
+        trace = EntryTraceHandler(logging.DEBUG)
+        trace.setFormatter(logging.Formatter(_TRACE_FORMAT))
+        logger.addHandler(trace)
+        logger.setLevel(logging.DEBUG)
+    else:
+        logger.setLevel(level)
+
+
+def trace_path(entry):
+    """条目的跟踪文件路径：名称中的非法字符替换掉，再加URL哈希区分同名条目"""
+    name = _UNSAFE_CHARS.sub('_', entry.get('name') or 'entry')[:80]
+    digest = hashlib.sha1(entry.get('url', '').encode('utf-8')).hexdigest()[:8]
+    return os.path.join(_trace_dir, f"{name}-{digest}.log")
+
+
+@contextmanager
+def trace_entry(entry):
+    """在with块中，当前线程的日志同时写入该条目的跟踪文件；未配置trace_dir或已在某个条目中时不做任何事"""
+    if not _trace_dir or getattr(_current, 'stream', None) is not None:
+        yield
+        return
+    with open(trace_path(entry), 'w', encoding='utf-8') as stream:
+        _current.stream = stream
+        try:
+            yield
+        finally:
+            _current.stream = None
@@ -0,0 +1,203 @@
+from bisect import bisect_left
+
+
+# 容器评分中"结构化内容"统计的元素：与原XPath
+# .//p | .//h1 | ... | .//li | .//table | .//div[contains(@class,'content')] | .//section 一致
+STRUCTURED_TAGS = {'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'table', 'section'}
+
+
+def container_depth(element):
+    """元素距离body的层级深度：沿getparent()向上数到body或html为止（不含body/html）"""
+    depth = 0
+    while element is not None and element.tag not in ('body', 'html'):
+        depth += 1
+        element = element.getparent()
+    return depth
+
+
+def _is_structured(element):
+    if element.tag in STRUCTURED_TAGS:
+        return True
+    return element.tag == 'div' and 'content' in element.get('class', '')
+
+
+class DomFeatures:
+    """一次迭代后序遍历，为子树中每个元素计算评分要用的特征，评分时直接查表
+
+    所有文本按文档顺序拼成一个字符串，每个元素记录自己在其中的区间，
+    元素的text_content()就是这个字符串的切片，不需要再遍历子树；
+    去掉首尾空白后的文字长度、结构化元素数、图片数、链接数和链接文字长度
+    在后序遍历时算出（计数由子节点累加）。整个计算与DOM大小成线性关系。
+    删除节点要通过remove()进行，它只更新被删节点祖先的特征；直接改动树后需要重新构建。
+    同时记录每个元素的先序编号区间，祖先/后代判断只需比较两个整数（删除节点不影响其余元素的区间），
+    以及距离body的深度和子树高度，供按层级选择容器时查表。
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.spans = {}
+        self.counts = {}
+        # 元素 -> (先序编号, 子树中最后一个元素的先序编号)
+        self.intervals = {}
+        # 元素 -> 距离body的深度（同container_depth）；元素 -> 子树高度（叶子为1）
+        self.depths = {}
+        self.heights = {}
+        # 祖先元素 -> 其区间内已删除的文本区间；文字长度待重新计算的元素
+        self.holes = {}
+        self.stale = set()
+        self._build(root)
+
+    def _build(self, root):
+        parts = []
+        position = 0
+        # 每段文本中第一个非空白字符的位置（递增），以及目前为止最后一个非空白字符之后的位置
+        nonblank_starts = []
+        nonblank_end = 0
+
+        preorder = 0
+        stack = [(root, False, 0, 0)]
+        while stack:
+            node, leaving, start, first = stack.pop()
+            is_element = isinstance(node.tag, str)
+            if not leaving:
+                start = position
+                first = preorder
+                if is_element:
+                    preorder += 1
+                    if node is root:
+                        self.depths[node] = container_depth(node)
+                    elif node.tag in ('body', 'html'):
+                        self.depths[node] = 0
+                    else:
+                        self.depths[node] = self.depths[node.getparent()] + 1
+                # 注释和处理指令的内容不属于text_content()，但它们的tail属于
+                if is_element and node.text:
+                    text = node.text
+                    if text.strip():
+                        nonblank_starts.append(position + len(text) - len(text.lstrip()))
+                        nonblank_end = position + len(text.rstrip())
+                    parts.append(text)
+                    position += len(text)
+                stack.append((node, True, start, first))
+                stack.extend((child, False, 0, 0) for child in reversed(node))
+                continue
+
+            if is_element:
+                self.spans[node] = (start, position)
+                self.intervals[node] = (first, preorder - 1)
+                # 区间内第一个非空白字符到最后一个非空白字符之后，即 len(text_content().strip())
+                i = bisect_left(nonblank_starts, start)
+                if i < len(nonblank_starts) and nonblank_starts[i] < position:
+                    text_length = nonblank_end - nonblank_starts[i]
+                else:
+                    text_length = 0
+
+                structured = images = links = link_text_length = 0
+                height = 1
+                for child in node:
+                    if not isinstance(child.tag, str):
+                        continue
+                    height = max(height, self.heights[child] + 1)
+                    child_counts = self.counts[child]
+                    structured += child_counts[1] + (1 if _is_structured(child) else 0)
+                    images += child_counts[2] + (1 if child.tag == 'img' else 0)
+                    links += child_counts[3]
+                    link_text_length += child_counts[4]
+                    if child.tag == 'a':
+                        links += 1
+                        link_text_length += child_counts[0]
+                self.counts[node] = (text_length, structured, images, links, link_text_length)
+                self.heights[node] = height
+
+            if node is not root and node.tail:
+                tail = node.tail
+                if tail.strip():
+                    nonblank_starts.append(position + len(tail) - len(tail.lstrip()))
+                    nonblank_end = position + len(tail.rstrip())
+                parts.append(tail)
+                position += len(tail)
+        self.text = ''.join(parts)
+
+    def remove(self, element):
+        """从树中删除element并同步更新特征表，返回特征改变了的祖先元素（由近到远）
+
+        与lxml的remove()相同，element的tail随它一起删除。其他元素的子树没有变化，特征保持不变。
+        """
+        parent = element.getparent()
+        start, end = self.spans[element]
+        end += len(element.tail or '')
+        text_length = self.text_length(element)
+        _, structured, images, links, link_text_length = self.counts[element]
+        structured += 1 if _is_structured(element) else 0
+        images += 1 if element.tag == 'img' else 0
+        if element.tag == 'a':
+            links += 1
+            link_text_length += text_length
+        parent.remove(element)
+
+        ancestors = []
+        node = parent
+        while node is not None and node in self.spans:
+            self.holes.setdefault(node, []).append((start, end))
+            counts = self.counts[node]
+            self.counts[node] = (counts[0], counts[1] - structured, counts[2] - images, counts[3] - links,
+                                 counts[4] - link_text_length)
+            self.heights[node] = 1 + max((self.heights[child] for child in node if isinstance(child.tag, str)),
+                                         default=0)
+            if node.tag == 'a':
+                # 链接自身文字变短，更上层祖先的链接文字长度也要相应减少
+                new_length = len(self.text_of(node).strip())
+                link_text_length += counts[0] - new_length
+                self.counts[node] = (new_length,) + self.counts[node][1:]
+            else:
+                self.stale.add(node)
+            ancestors.append(node)
+            node = node.getparent()
+        return ancestors
+
+    def is_descendant(self, element, ancestor):
+        """element是否是ancestor的后代（不含自身），等价于沿getparent()向上查找"""
+        first, _ = self.intervals[element]
+        ancestor_first, ancestor_last = self.intervals[ancestor]
+        return ancestor_first < first <= ancestor_last
+
+    def depth(self, element):
+        """等价于 container_depth(element)"""
+        return self.depths[element]
+
+    def height(self, element):
+        """子树高度：没有子元素为1，否则为子元素最大高度加1"""
+        return self.heights[element]
+
+    def text_of(self, element):
+        """等价于 element.text_content()"""
+        start, end = self.spans[element]
+        holes = self.holes.get(element)
+        if not holes:
+            return self.text[start:end]
+        parts = []
+        for hole_start, hole_end in sorted(holes):
+            # 先删除的后代区间可能包含在后删除的祖先区间内
+            parts.append(self.text[start:hole_start])
+            start = max(start, hole_end)
+        parts.append(self.text[start:end])
+        return ''.join(parts)
+
+    def text_length(self, element):
+        """等价于 len(element.text_content().strip())"""
+        if element in self.stale:
+            self.stale.discard(element)
+            self.counts[element] = (len(self.text_of(element).strip()),) + self.counts[element][1:]
+        return self.counts[element][0]
+
+    def structured_count(self, element):
+        return self.counts[element][1]
+
+    def image_count(self, element):
+        return self.counts[element][2]
+
+    def link_count(self, element):
+        return self.counts[element][3]
+
+    def link_text_length(self, element):
+        return self.counts[element][4]
@@ -0,0 +1,127 @@
+import json
+from threading import Lock
+from urllib.parse import urlparse
+
+from diagnostics import logger
+
+
+def _load_pyarrow():
+    """pyarrow是可选依赖且导入较慢，真正导出Parquet时才导入；未安装时返回 (None, None)"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None, None
+    return pa, pq
+
+
+# 每个条目一行的结果列
+ENTRY_COLUMNS = [
+    ('job_id', 'int64'), ('input_file', 'string'), ('position', 'int64'), ('name', 'string'),
+    ('url', 'string'), ('host', 'string'), ('status', 'string'), ('xpath', 'string'),
+    ('fetch_tier', 'string'), ('fetch_seconds', 'float64'), ('analysis_seconds', 'float64'),
+    ('total_seconds', 'float64'), ('candidate_count', 'int64'),
+]
+
+# 每个候选容器一行的特征列（来自 calculate_content_container_score）
+CANDIDATE_COLUMNS = [
+    ('job_id', 'int64'), ('url', 'string'), ('path', 'string'), ('tag', 'string'), ('class', 'string'),
+    ('id', 'string'), ('role', 'string'), ('text_length', 'int64'), ('link_count', 'int64'),
+    ('link_text_length', 'int64'), ('header_hits', 'int64'),
+    ('footer_hits', 'int64'), ('interference_hits', 'int64'), ('content_features', 'string'),
+    ('content_score', 'int64'), ('positive_hits', 'int64'), ('structured_count', 'int64'),
+    ('image_count', 'int64'), ('score', 'int64'), ('removed', 'bool'), ('chosen', 'bool'),
+]
+
+
+class _ColumnarFile:
+    """同一张表的JSON Lines文件和（可选的）Parquet文件，按批次追加"""
+
+    def __init__(self, prefix, columns, parquet):
+        self.columns = columns
+        self.jsonl = open(prefix + '.jsonl', 'w', encoding='utf-8')
+        self.parquet_path = prefix + '.parquet'
+        self.parquet_writer = None
+        self.schema = None
+        self.pa, self.pq = _load_pyarrow() if parquet else (None, None)
+        if self.pa is not None:
+            self.schema = self.pa.schema([(name, getattr(self.pa, dtype)()) for name, dtype in columns])
+
+    def write_batch(self, rows):
+        if not rows:
+            return
+        rows = [{name: row.get(name) for name, _ in self.columns} for row in rows]
+        self.jsonl.write(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows))
+        self.jsonl.flush()
+        if self.schema is not None:
+            if self.parquet_writer is None:
+                self.parquet_writer = self.pq.ParquetWriter(self.parquet_path, self.schema)
+            self.parquet_writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.jsonl.close()
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+
+
+class FeatureExporter:
+    """把每个条目的结果和每个候选容器的评分特征按批次导出为JSON Lines和Parquet
+
+    输出 {prefix}.entries.jsonl / {prefix}.candidates.jsonl，安装了pyarrow时
+    另外输出同名的 .parquet 文件，可直接用dataframe加载分析。
+    """
+
+    def __init__(self, prefix, batch_size=500, parquet=True):
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.lock = Lock()
+        self.entries = _ColumnarFile(prefix + '.entries', ENTRY_COLUMNS, parquet)
+        self.candidates = _ColumnarFile(prefix + '.candidates', CANDIDATE_COLUMNS, parquet)
+        self._entry_rows = []
+        self._candidate_rows = []
+        if parquet and self.entries.pa is None:
+            logger.warning("未安装pyarrow，只导出JSON Lines")
+
+    def add_entry(self, result, job_id, input_file=None, position=None, candidate_count=0):
+        timings = result.get('timings') or {}
+        row = {
+            'job_id': job_id,
+            'input_file': input_file,
+            'position': position,
+            'name': result['name'],
+            'url': result['url'],
+            'host': urlparse(result['url']).netloc.lower(),
+            'status': result.get('status'),
+            'xpath': result.get('xpath'),
+            'fetch_tier': (result.get('fetch') or {}).get('tier'),
+            'fetch_seconds': timings.get('fetch'),
+            'analysis_seconds': timings.get('analysis'),
+            'total_seconds': timings.get('total'),
+            'candidate_count': candidate_count,
+        }
+        with self.lock:
+            self._entry_rows.append(row)
+            if len(self._entry_rows) >= self.batch_size:
+                self._flush_entries()
+
+    def add_candidates(self, job_id, url, candidate_rows):
+        with self.lock:
+            for row in candidate_rows or []:
+                self._candidate_rows.append({**row, 'job_id': job_id, 'url': url})
+            if len(self._candidate_rows) >= self.batch_size:
+                self._flush_candidates()
+
+    def _flush_entries(self):
+        self.entries.write_batch(self._entry_rows)
+        self._entry_rows = []
+
+    def _flush_candidates(self):
+        self.candidates.write_batch(self._candidate_rows)
+        self._candidate_rows = []
+
+    def close(self):
+        with self.lock:
+            self._flush_entries()
+            self._flush_candidates()
+            self.entries.close()
+            self.candidates.close()
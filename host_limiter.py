@@ -0,0 +1,180 @@
+import re
+from threading import Condition, local
+
+
+# 需要乘性降低并发的错误类型：超时、限流、WAF拦截(412)、服务端错误
+BACKOFF_ERROR_KINDS = {'timeout', 'http_429', 'http_412', 'http_5xx'}
+
+
+class AdaptiveHostLimiter:
+    """按站点(host)自适应并发控制（AIMD）
+
+    站点延迟和错误率正常时并发上限加性增长；遇到超时、429/412/5xx 或延迟突增时乘性降低。
+    """
+
+    def __init__(self, initial_limit=1.0, min_limit=1.0, max_limit=8.0, additive_step=1.0,
+                 decrease_factor=0.5, latency_spike=2.0, ewma_alpha=0.3, error_rate_threshold=0.3):
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.additive_step = additive_step
+        self.decrease_factor = decrease_factor
+        self.latency_spike = latency_spike
+        self.ewma_alpha = ewma_alpha
+        self.error_rate_threshold = error_rate_threshold
+        self.condition = Condition()
+        self.hosts = {}
+        # 调度器派发条目时为工作线程预留的站点额度（try_acquire），该线程随后的acquire直接使用
+        self._reserved = local()
+        self.release_callbacks = []
+
+    def _state(self, host):
+        if host not in self.hosts:
+            self.hosts[host] = {
+                'limit': self.initial_limit,
+                'inflight': 0,
+                'peak_inflight': 0,
+                'latency': None,
+                'error_rate': 0.0,
+                'requests': 0,
+                'errors': 0,
+                'decreases': 0,
+            }
+        return self.hosts[host]
+
+    def try_acquire(self, host):
+        """不等待：该站点并发未满时占用一个额度并为当前线程预留，返回是否成功
+
+        调度器派发条目前调用，站点已满时条目留在队列中，工作线程去处理其他站点的条目；
+        预留的额度由该线程随后对同一站点的acquire直接使用，条目结束时未使用的由cancel_reservation归还。
+        """
+        with self.condition:
+            state = self._state(host)
+            if state['inflight'] >= max(int(state['limit']), 1):
+                return False
+            state['inflight'] += 1
+            state['peak_inflight'] = max(state['peak_inflight'], state['inflight'])
+        self._reserved.host = host
+        return True
+
+    def acquire(self, host):
+        """等待直到该站点的并发数低于当前上限；当前线程已预留该站点额度时直接返回"""
+        if getattr(self._reserved, 'host', None) == host:
+            self._reserved.host = None
+            return
+        with self.condition:
+            state = self._state(host)
+            while state['inflight'] >= max(int(state['limit']), 1):
+                self.condition.wait()
+            state['inflight'] += 1
+            state['peak_inflight'] = max(state['peak_inflight'], state['inflight'])
+
+    def cancel_reservation(self):
+        """归还当前线程预留但没有用到的额度（不计入延迟和错误统计）"""
+        host = getattr(self._reserved, 'host', None)
+        if host is None:
+            return
+        self._reserved.host = None
+        with self.condition:
+            self._state(host)['inflight'] -= 1
+            self.condition.notify_all()
+        self._notify_release()
+
+    def on_release(self, callback):
+        """注册站点额度归还后执行的动作，例如唤醒等待派发的调度器"""
+        self.release_callbacks.append(callback)
+
+    def remove_release_callback(self, callback):
+        if callback in self.release_callbacks:
+            self.release_callbacks.remove(callback)
+
+    def _notify_release(self):
+        for callback in list(self.release_callbacks):
+            callback()
+
+    def release(self, host, latency, error_kind=None):
+        """归还并发额度，并根据本次请求的延迟和错误类型调整该站点的并发上限"""
+        with self.condition:
+            state = self._state(host)
+            state['inflight'] -= 1
+            state['requests'] += 1
+
+            is_error = error_kind in BACKOFF_ERROR_KINDS
+            if is_error:
+                state['errors'] += 1
+            state['error_rate'] = (1 - self.ewma_alpha) * state['error_rate'] + self.ewma_alpha * (1.0 if is_error else 0.0)
+
+            latency_spiked = state['latency'] is not None and latency > state['latency'] * self.latency_spike
+            if is_error or latency_spiked or state['error_rate'] > self.error_rate_threshold:
+                # 乘性降低
+                state['limit'] = max(self.min_limit, state['limit'] * self.decrease_factor)
+                state['decreases'] += 1
+            else:
+                # 加性增长：每个"窗口"（limit个成功请求）增加additive_step
+                state['limit'] = min(self.max_limit, state['limit'] + self.additive_step / max(state['limit'], 1.0))
+
+            if not is_error:
+                if state['latency'] is None:
+                    state['latency'] = latency
+                else:
+                    state['latency'] = (1 - self.ewma_alpha) * state['latency'] + self.ewma_alpha * latency
+
+            self.condition.notify_all()
+        self._notify_release()
+
+    def limits(self):
+        with self.condition:
+            return {host: state['limit'] for host, state in self.hosts.items()}
+
+    def summary(self, top=20):
+        """按请求数排序输出各站点当前并发上限、峰值并发、平均延迟和错误数"""
+        with self.condition:
+            items = sorted(self.hosts.items(), key=lambda x: x[1]['requests'], reverse=True)[:top]
+            lines = []
+            for host, state in items:
+                latency = f"{state['latency']:.1f}s" if state['latency'] is not None else "-"
+                lines.append(f"站点 {host}: 并发上限 {state['limit']:.2f}, 峰值并发 {state['peak_inflight']}, "
+                             f"平均延迟 {latency}, 请求 {state['requests']}, 错误 {state['errors']}, "
+                             f"降速 {state['decreases']} 次")
+            return lines
+
+
+def classify_status(status_code):
+    """HTTP状态码归类为 http_429 / http_412 / http_5xx / http_4xx，正常状态返回None"""
+    if status_code in (429, 412):
+        return f'http_{status_code}'
+    if status_code >= 500:
+        return 'http_5xx'
+    if status_code >= 400:
+        return 'http_4xx'
+    return None
+
+
+# 浏览器显示的错误页标题以状态码开头，如 "503 Service Temporarily Unavailable"、"429 Too Many Requests"
+_ERROR_PAGE_TITLE = re.compile(r'^\s*([45]\d\d)\b')
+
+
+def classify_error_page(status_code=None, title=None):
+    """浏览器获取页面时没有HTTP异常：按导航响应状态码或错误页标题归类，正常页面返回None"""
+    if status_code:
+        return classify_status(status_code)
+    match = _ERROR_PAGE_TITLE.match(title or '')
+    return classify_status(int(match.group(1))) if match else None
+
+
+def classify_fetch_error(error):
+    """把获取页面时的异常归类为 timeout / http_429 / http_412 / http_5xx / http_4xx / network / error"""
+    response = getattr(error, 'response', None)
+    status_code = getattr(response, 'status_code', None)
+    if status_code is not None:
+        kind = classify_status(status_code)
+        if kind is not None:
+            return kind
+
+    name = type(error).__name__.lower()
+    message = str(error).lower()
+    if 'timeout' in name or 'timed out' in message or 'timeout' in message:
+        return 'timeout'
+    if 'connection' in name or 'connection' in message:
+        return 'network'
+    return 'error'
@@ -0,0 +1,175 @@
+import re
+from bisect import bisect_right
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+# 所有评分函数共用的关键词表：类别 -> 关键词。各函数原来各自维护的列表在这里集中登记，
+# 不同函数使用的列表并不完全相同（例如有的只有中文，有的多了"政务服务"这样的长词），按原样保留为不同类别
+KEYWORD_REGISTRY = {
+    # 页面首部/尾部的内容特征：内容回溯、容器评分、列表评分
+    'header_content': (
+        '登录', '注册', '首页', '主页', '无障碍', '政务', '办事', '互动',
+        '走进', '移动版', '手机版', '导航', '菜单', '搜索', '市政府',
+        'login', 'register', 'home', 'menu', 'search', 'nav',
+    ),
+    'footer_content': (
+        '网站说明', '网站标识码', '版权所有', '主办单位', '承办单位',
+        '技术支持', '联系我们', '网站地图', '隐私政策', '免责声明',
+        '备案号', 'icp', '公安备案', '政府网站', '网站管理',
+        'copyright', 'all rights reserved', 'powered by', 'designed by',
+    ),
+    # 回溯找首部/尾部容器时，body下直接包裹元素的div的判断（只有中文关键词）
+    'header_content_cn': (
+        '登录', '注册', '首页', '主页', '无障碍', '政务', '办事', '互动',
+        '走进', '移动版', '手机版', '导航', '菜单', '搜索', '市政府',
+    ),
+    'footer_content_cn': (
+        '网站说明', '网站标识码', '版权所有', '主办单位', '承办单位',
+        '技术支持', '联系我们', '网站地图', '隐私政策', '免责声明',
+        '备案号', 'icp', '公安备案', '政府网站', '网站管理',
+    ),
+    # 预处理时判断页面级干扰容器
+    'interference_header_content': (
+        '登录', '注册', '首页', '主页', '无障碍', '政务服务', '办事服务',
+        '互动交流', '走进', '移动版', '手机版', '导航', '菜单', '搜索',
+        'login', 'register', 'home', 'menu', 'search', 'nav',
+    ),
+    'interference_footer_content': (
+        '网站说明', '网站标识码', '版权所有', '主办单位', '承办单位',
+        '技术支持', '联系我们', '网站地图', '隐私政策', '免责声明',
+        '备案号', 'icp', '公安备案', '政府网站', '网站管理',
+        'copyright', 'all rights reserved', 'powered by',
+    ),
+    'interference_identifier': (
+        'header', 'footer', 'nav', 'navigation', 'menu', 'menubar',
+        'topbar', 'bottom', 'sidebar', 'aside', 'banner',
+    ),
+    # 内容容器评分的类名/ID特征
+    'strong_interference_identifier': (
+        'header', 'footer', 'nav', 'navigation', 'menu', 'menubar',
+        'topbar', 'bottom', 'sidebar', 'aside', 'banner', 'ad', 'advertisement',
+    ),
+    'positive_identifier': (
+        'content', 'main', 'article', 'news', 'data', 'info',
+        'detail', 'result', 'list', 'body', 'text', 'container',
+    ),
+    # 列表容器定位（find_list_container）
+    'list_ancestry_content': ('网站说明', '网站标识码', '版权所有', '备案号', '登录', '注册', '首页', '无障碍'),
+    'list_ancestor_header_content': ('登录', '注册', '首页', '主页', '无障碍', '政务', '办事', '互动', '走进'),
+    'list_ancestor_footer_content': ('网站说明', '网站标识码', '版权所有', '备案号', 'icp', '主办单位', '承办单位'),
+    'strong_nav_words': ('登录', '注册', '首页', '主页', '联系我们', '关于我们'),
+}
+
+
+class KeywordMatcher:
+    """按类别批量匹配关键词：文本只转一次小写，一次匹配得到每个类别命中的关键词集合
+
+    安装了pyahocorasick时使用预编译的Aho-Corasick自动机，一遍扫描文本匹配所有关键词；
+    否则对请求类别的关键词逐个用str的子串查找（C实现，在CPython中比纯Python自动机更快）。
+    两种方式结果相同：命中集合即"文本中出现过的关键词"。
+    """
+
+    def __init__(self, registry):
+        self.registry = {category: frozenset(keyword.lower() for keyword in keywords)
+                         for category, keywords in registry.items()}
+        # 保留登记顺序，locate按此顺序拼接结果
+        self.ordered = {category: tuple(dict.fromkeys(keyword.lower() for keyword in keywords))
+                        for category, keywords in registry.items()}
+        self._keywords_for = {}
+        self._scanners = {}
+        self.automaton = None
+        if ahocorasick is not None:
+            self.automaton = ahocorasick.Automaton()
+            for keyword in set().union(*self.registry.values()):
+                self.automaton.add_word(keyword, keyword)
+            self.automaton.make_automaton()
+
+    def _keywords(self, categories):
+        keywords = self._keywords_for.get(categories)
+        if keywords is None:
+            keywords = self._keywords_for[categories] = frozenset().union(*(self.registry[c] for c in categories))
+        return keywords
+
+    def match(self, text, *categories, lower=True):
+        """返回 {类别: 命中的关键词集合}；不指定类别时匹配所有类别，lower=False表示text已经是小写"""
+        categories = categories or tuple(self.registry)
+        if lower:
+            text = text.lower()
+        if self.automaton is not None:
+            found = {keyword for _, keyword in self.automaton.iter(text)}
+        else:
+            found = {keyword for keyword in self._keywords(categories) if keyword in text}
+        return {category: found & self.registry[category] for category in categories}
+
+    def count(self, text, category, lower=True):
+        """文本中出现的该类别关键词个数"""
+        return len(self.match(text, category, lower=lower)[category])
+
+    def _scanner(self, categories):
+        """返回 (正则, 隐含关系)：正则在每个位置匹配从该位置开始的最长关键词，
+        隐含关系把命中的关键词展开为它包含的所有更短关键词（它们必然同时出现）"""
+        scanner = self._scanners.get(categories)
+        if scanner is None:
+            keywords = sorted(self._keywords(categories), key=len, reverse=True)
+            pattern = re.compile('(?=(' + '|'.join(re.escape(keyword) for keyword in keywords) + '))')
+            implied = {keyword: [other for other in keywords if other in keyword] for keyword in keywords}
+            scanner = self._scanners[categories] = (pattern, implied)
+        return scanner
+
+    def locate(self, root, *categories):
+        """一次遍历整个文档，返回 {类别: 元素列表}，与对每个关键词执行
+        //*[contains(text(), '关键词')] 再按关键词顺序拼接的结果相同（区分大小写，
+        只看元素的第一个文本节点；同一元素命中多个关键词时出现多次）"""
+        root = root.getroottree().getroot()
+        elements = []
+        starts = []
+        parts = []
+        position = 0
+        for element in root.iter():
+            if not isinstance(element.tag, str):
+                continue
+            text = first_text(element)
+            if text is None:
+                continue
+            elements.append(element)
+            starts.append(position)
+            parts.append(text)
+            position += len(text) + 1
+        # 文本之间用NUL分隔，关键词不含NUL，不会跨元素命中
+        joined = '\0'.join(parts)
+
+        wanted = self._keywords(categories)
+        found = {}
+        if self.automaton is not None:
+            occurrences = ((end - len(keyword) + 1, (keyword,)) for end, keyword in self.automaton.iter(joined)
+                           if keyword in wanted)
+        else:
+            pattern, implied = self._scanner(categories)
+            occurrences = ((match.start(), implied[match.group(1)]) for match in pattern.finditer(joined))
+        for start, keywords in occurrences:
+            index = bisect_right(starts, start) - 1
+            for keyword in keywords:
+                hits = found.setdefault(keyword, [])
+                if not hits or hits[-1] != index:
+                    hits.append(index)
+
+        return {category: [elements[index] for keyword in self.ordered[category] for index in found.get(keyword, ())]
+                for category in categories}
+
+
+def first_text(element):
+    """元素的第一个文本子节点（XPath中 contains(text(), ...) 取的就是它），没有则返回None"""
+    if element.text:
+        return element.text
+    for child in element:
+        if child.tail:
+            return child.tail
+    return None
+
+
+# 全局匹配器：模块加载时按关键词表构建一次
+keyword_matcher = KeywordMatcher(KEYWORD_REGISTRY)
@@ -0,0 +1,191 @@
+import time
+from collections import deque
+from queue import Queue
+from threading import Condition, Thread
+
+
+class LaneScheduler:
+    """分通道调度器：每个通道有自己的并发上限，按优先级先跑低成本通道
+
+    lane_limits 为 {通道名: 并发上限}，priority 为通道优先级顺序（靠前的先调度）。
+    工作线程总数等于各通道上限之和；当某个通道没有待处理任务时，
+    它空出来的并发额度可以借给其他还有任务的通道（borrow=True）；borrowable 限定哪些通道可以借用
+    （默认所有通道），不在其中的通道严格不超过自己的并发上限。
+    throttle()后 throttled_limits 中的通道改用其中的上限（例如内存紧张时），unthrottle()恢复；
+    上限为0的通道只在调度器完全空闲时派发一个任务，不会一直等待。
+    admit(任务)不为空时，派发前调用它（不能阻塞），返回False的任务留在队列中，先派发后面的任务，
+    例如站点并发已满的条目；此时工作线程等待wake()唤醒。任务结束后在同一工作线程中调用finish(任务)。
+    调用start()后工作线程常驻，多次run（可以来自不同线程）共用这些线程和各通道的并发上限；
+    否则每次run临时启动工作线程，任务处理完后退出。
+    """
+
+    def __init__(self, lane_limits, priority=None, borrow=True, admit=None, finish=None, borrowable=None,
+                 throttled_limits=None):
+        self.lane_limits = dict(lane_limits)
+        self.priority = list(priority or self.lane_limits)
+        self.borrow = borrow
+        self.borrowable = set(self.lane_limits if borrowable is None else borrowable)
+        self.admit = admit
+        self.finish = finish
+        self.throttled_limits = dict(throttled_limits or {})
+        self.throttled = False
+        self.condition = Condition()
+        self.pending = {lane: deque() for lane in self.lane_limits}
+        self.running = {lane: 0 for lane in self.lane_limits}
+        self.stats = {lane: {'done': 0, 'seconds': 0.0, 'borrowed': 0} for lane in self.lane_limits}
+        self._stopped = False
+        self._threads = []
+
+    def _take(self, lane):
+        """取出该通道中第一个可以派发的任务，没有则返回None；调用方需持有condition"""
+        pending = self.pending[lane]
+        if not pending or self.admit is None:
+            return pending.popleft() if pending else None
+        for position, job in enumerate(pending):
+            if self.admit(job[1]):
+                del pending[position]
+                return job
+        return None
+
+    def _limit(self, lane):
+        """通道当前的并发上限；调用方需持有condition"""
+        if self.throttled and lane in self.throttled_limits:
+            return min(self.lane_limits[lane], self.throttled_limits[lane])
+        return self.lane_limits[lane]
+
+    def _pick(self):
+        """选出下一个要调度的 (通道, 任务, 是否借用额度)；调用方需持有condition"""
+        idle = not any(self.running.values())
+        for lane in self.priority:
+            if self.running[lane] < self._limit(lane) or idle:
+                job = self._take(lane)
+                if job is not None:
+                    return lane, job, False
+        if self.borrow:
+            # 有空闲线程却没有未满额的通道有可派发的任务，说明空闲额度属于已经没有任务的通道，可以借用
+            for lane in self.priority:
+                if lane not in self.borrowable:
+                    continue
+                job = self._take(lane)
+
+                if job is not None:
+                    return lane, job, True
+        return None, None, False
+
+    def throttle(self):
+        """改用throttled_limits中的并发上限，正在运行的任务不受影响"""
+        with self.condition:
+            self.throttled = True
+
+    def unthrottle(self):
+        with self.condition:
+            self.throttled = False
+            self.condition.notify_all()
+
+    def wake(self):
+        """admit的条件可能已经变化（例如站点额度归还），唤醒等待的工作线程重新挑选任务"""
+        with self.condition:
+            self.condition.notify_all()
+
+    def queue_depths(self):
+        with self.condition:
+            return {lane: len(jobs) for lane, jobs in self.pending.items()}
+
+    def running_counts(self):
+        with self.condition:
+            return dict(self.running)
+
+    def _worker_loop(self, persistent):
+        while True:
+            with self.condition:
+                while True:
+                    if self._stopped or not (persistent or any(self.pending.values())):
+                        return
+                    lane, job, borrowed = self._pick()
+                    if lane is not None:
+                        break
+                    self.condition.wait()
+                index, item, worker, results = job
+                self.running[lane] += 1
+                if borrowed:
+                    self.stats[lane]['borrowed'] += 1
+
+            start_time = time.time()
+            try:
+                results.put((index, worker(item), None))
+            except Exception as e:
+                results.put((index, None, e))
+            finally:
+                if self.finish is not None:
+                    self.finish(item)
+                with self.condition:
+                    self.running[lane] -= 1
+                    self.stats[lane]['done'] += 1
+                    self.stats[lane]['seconds'] += time.time() - start_time
+                    self.condition.notify_all()
+
+    def _start_threads(self, persistent):
+        threads = [Thread(target=self._worker_loop, args=(persistent,), daemon=True)
+                   for _ in range(max(sum(self.lane_limits.values()), 1))]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def start(self):
+        """启动常驻工作线程，之后的run只提交任务并等待结果"""
+        if not self._threads:
+            self._threads = self._start_threads(persistent=True)
+        return self
+
+    def run(self, jobs, worker, on_result, on_error=None):
+        """运行 jobs=[(通道名, 序号, 任务)]，在调用线程中依次回调 on_result(序号, 结果)
+
+        worker抛出异常时回调 on_error(序号, 异常) 得到替代结果；未提供on_error时异常向上抛出。
+        """
+        results = Queue()
+        with self.condition:
+            for lane, index, item in jobs:
+                self.pending[lane].append((index, item, worker, results))
+            self.condition.notify_all()
+        threads = [] if self._threads else self._start_threads(persistent=False)
+
+        try:
+            for _ in range(len(jobs)):
+                index, result, error = results.get()
+                if error is not None:
+                    if on_error is None:
+                        raise error
+                    result = on_error(index, error)
+                on_result(index, result)
+        except BaseException:
+            # Ctrl-C或回调出错时不再调度本次run剩余的任务，正在运行的任务自然结束
+            self.cancel(results)
+            raise
+
+        for thread in threads:
+            thread.join()
+
+    def cancel(self, results):
+        """从队列中移除某次run尚未派发的任务"""
+        with self.condition:
+            for lane, jobs in self.pending.items():
+                self.pending[lane] = deque(job for job in jobs if job[3] is not results)
+            self.condition.notify_all()
+
+    def stop(self):
+        """停止所有工作线程（常驻线程也退出），队列中的任务不再派发"""
+        with self.condition:
+            self._stopped = True
+            self.condition.notify_all()
+
+    def summary(self):
+        """各通道处理条目数、平均耗时和借用额度次数"""
+        lines = []
+        for lane in self.priority:
+            stat = self.stats[lane]
+            if stat['done'] == 0:
+                continue
+            average = stat['seconds'] / stat['done']
+            lines.append(f"通道 {lane}: {stat['done']} 个条目, 平均 {average:.1f}s, "
+                         f"并发上限 {self.lane_limits[lane]}, 借用额度 {stat['borrowed']} 次")
+        return lines
@@ -0,0 +1,197 @@
+import gc
+import os
+import time
+from threading import Condition
+
+from diagnostics import logger
+
+# psutil是可选依赖，第一次采样内存时才导入
+_psutil = None
+_psutil_loaded = False
+
+
+def _get_psutil():
+    global _psutil, _psutil_loaded
+    if not _psutil_loaded:
+        try:
+            import psutil
+            _psutil = psutil
+        except ImportError:
+            _psutil = None
+        _psutil_loaded = True
+    return _psutil
+
+
+def _proc_rss_bytes(pid):
+    """从/proc读取进程的常驻内存（Linux），读取失败返回0"""
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def _proc_children(pid):
+    """扫描/proc找出pid的所有后代进程（chromedriver及其启动的Chrome进程）"""
+    parents = {}
+    try:
+        names = os.listdir('/proc')
+    except OSError:
+        return []
+    for name in names:
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat', 'r') as f:
+                # 第二个字段是可能含空格的进程名，用最后一个')'切分
+                fields = f.read().rsplit(')', 1)[1].split()
+            parents.setdefault(int(fields[1]), []).append(int(name))
+        except (OSError, ValueError, IndexError):
+            continue
+
+    descendants = []
+    stack = [pid]
+    while stack:
+        for child in parents.get(stack.pop(), []):
+            descendants.append(child)
+            stack.append(child)
+    return descendants
+
+
+def sample_memory(pid=None):
+    """返回 (Python进程RSS, 子进程RSS之和)，单位字节"""
+    pid = pid or os.getpid()
+    psutil = _get_psutil()
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            children_rss = 0
+            for child in process.children(recursive=True):
+                try:
+                    children_rss += child.memory_info().rss
+                except psutil.Error:
+                    continue
+            return process.memory_info().rss, children_rss
+        except psutil.Error:
+            pass
+    return _proc_rss_bytes(pid), sum(_proc_rss_bytes(child) for child in _proc_children(pid))
+
+
+class MemoryGovernor:
+    """内存水位控制：Python进程加Chrome子进程的RSS超过软水位时，暂停接收新条目、
+    收缩浏览器池并强制回收lxml树，回落到 soft_limit * resume_ratio 以下后恢复
+
+    soft_limit_mb 为空时不做任何限制。
+    """
+
+    def __init__(self, soft_limit_mb=None, resume_ratio=0.85, check_interval=2.0):
+        self.soft_limit = soft_limit_mb * 1024 * 1024 if soft_limit_mb else None
+        self.resume_ratio = resume_ratio
+        self.check_interval = check_interval
+        self.condition = Condition()
+        self.under_pressure = False
+        self.inflight = 0
+        self.events = []
+        self.pressure_callbacks = []
+        self.recovery_callbacks = []
+        self._last_check = 0.0
+
+    def set_soft_limit(self, soft_limit_mb):
+        self.soft_limit = soft_limit_mb * 1024 * 1024 if soft_limit_mb else None
+
+    @property
+    def enabled(self):
+        return self.soft_limit is not None
+
+    def on_pressure(self, callback):
+        """注册超过软水位时执行的动作，例如收缩浏览器池"""
+        self.pressure_callbacks.append(callback)
+
+    def on_recovery(self, callback):
+        """注册内存回落后执行的动作，例如恢复浏览器池大小"""
+        self.recovery_callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        for callbacks in (self.pressure_callbacks, self.recovery_callbacks):
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def _log_event(self, kind, entry_name, python_rss, children_rss):
+        event = {
+            'time': time.time(),
+            'kind': kind,
+            'entry': entry_name,
+            'python_mb': python_rss / 1024 / 1024,
+            'children_mb': children_rss / 1024 / 1024,
+        }
+        self.events.append(event)
+        logger.warning("[内存] %s: Python %.0fMB + 子进程 %.0fMB, 软水位 %.0fMB, 触发条目: %s", kind,
+                       event['python_mb'], event['children_mb'], self.soft_limit / 1024 / 1024, entry_name)
+
+    def check(self, entry_name=None, force=False):
+        """采样内存并更新水位状态；调用方不持有condition"""
+        if not self.enabled:
+            return False
+        now = time.time()
+        if not force and now - self._last_check < self.check_interval:
+            return self.under_pressure
+        self._last_check = now
+
+        python_rss, children_rss = sample_memory()
+        total = python_rss + children_rss
+        callbacks = []
+        with self.condition:
+            if not self.under_pressure and total > self.soft_limit:
+                self.under_pressure = True
+                self._log_event('超过软水位，暂停接收新条目', entry_name, python_rss, children_rss)
+                callbacks = list(self.pressure_callbacks)
+            elif self.under_pressure and total < self.soft_limit * self.resume_ratio:
+                self.under_pressure = False
+                self._log_event('回落到恢复水位，继续接收新条目', entry_name, python_rss, children_rss)
+                callbacks = list(self.recovery_callbacks)
+                self.condition.notify_all()
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error("[内存] 执行水位回调出错: %s", e)
+
+        if self.under_pressure:
+            gc.collect()
+        return self.under_pressure
+
+    def admit(self, entry_name):
+        """接收新条目前调用：超过软水位时等待，直到内存回落或没有正在处理的条目"""
+        if not self.enabled:
+            return
+        self.check(entry_name, force=True)
+        with self.condition:
+            # 没有正在处理的条目时必须放行，否则基线内存过高会导致永远等待
+            while self.under_pressure and self.inflight > 0:
+                self.condition.wait(self.check_interval)
+                self.condition.release()
+                try:
+                    self.check(entry_name, force=True)
+                finally:
+                    self.condition.acquire()
+            self.inflight += 1
+
+    def release(self, entry_name):
+        """条目处理完成后调用"""
+        if not self.enabled:
+            return
+        with self.condition:
+            self.inflight -= 1
+            self.condition.notify_all()
+        self.check(entry_name, force=True)
+
+    def summary(self):
+        if not self.enabled:
+            return []
+        python_rss, children_rss = sample_memory()
+        return [f"内存: Python {python_rss / 1024 / 1024:.0f}MB + 子进程 {children_rss / 1024 / 1024:.0f}MB, "
+                f"软水位 {self.soft_limit / 1024 / 1024:.0f}MB, 水位事件 {len(self.events)} 次"]
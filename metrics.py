@@ -0,0 +1,219 @@
+import time
+from threading import Event, Lock, Thread
+
+from diagnostics import logger
+
+
+# 阶段耗时直方图的桶（秒）：覆盖毫秒级的分析到分钟级的浏览器获取
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+
+def _label_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(key, extra=None):
+    items = list(key) + list(extra or [])
+    if not items:
+        return ''
+    parts = []
+    for name, value in items:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class Metrics:
+    """运行指标：计数器、直方图和按需计算的仪表盘，可输出Prometheus文本格式"""
+
+    def __init__(self, prefix='xpath_'):
+        self.prefix = prefix
+        self.lock = Lock()
+        self.start_time = time.time()
+        self.counters = {}
+        self.histograms = {}
+        self.gauge_callbacks = {}
+        self.help = {}
+
+    def inc(self, name, labels=None, value=1):
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, labels=None, buckets=DEFAULT_BUCKETS):
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            key = _label_key(labels)
+            if key not in series:
+                series[key] = {'buckets': buckets, 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            histogram = series[key]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram['counts'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def register_gauge(self, name, callback, help_text=None):
+        """注册一个仪表盘，callback返回数值或 {((标签名, 标签值), ...): 数值}，在输出时才计算"""
+        with self.lock:
+            self.gauge_callbacks[name] = callback
+            if help_text:
+                self.help[name] = help_text
+
+    def unregister_gauge(self, name):
+        with self.lock:
+            self.gauge_callbacks.pop(name, None)
+
+    def counter_value(self, name, labels=None):
+        with self.lock:
+            series = self.counters.get(name, {})
+            if labels is None:
+                return sum(series.values())
+            return series.get(_label_key(labels), 0)
+
+    def counter_by_label(self, name, label):
+        """按某个标签汇总计数器，例如按失败类型统计"""
+        with self.lock:
+            totals = {}
+            for key, value in self.counters.get(name, {}).items():
+                label_value = dict(key).get(label)
+                totals[label_value] = totals.get(label_value, 0) + value
+            return totals
+
+    def histogram_mean(self, name, label=None, value=None):
+        """直方图的平均值；给定label和value时只统计该标签取值的序列"""
+        with self.lock:
+            histograms = [h for key, h in self.histograms.get(name, {}).items()
+                          if label is None or dict(key).get(label) == value]
+            count = sum(h['count'] for h in histograms)
+            return sum(h['sum'] for h in histograms) / count if count else None
+
+    def _gauge_values(self):
+        with self.lock:
+            callbacks = list(self.gauge_callbacks.items())
+        values = {}
+        for name, callback in callbacks:
+            try:
+                value = callback()
+            except Exception:
+                continue
+            if isinstance(value, dict):
+                values[name] = {tuple(sorted(labels)): v for labels, v in value.items()}
+            else:
+                values[name] = {(): value}
+        return values
+
+    def render_prometheus(self):
+        """输出Prometheus文本格式"""
+        lines = []
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                full_name = self.prefix + name
+                lines.append(f"# TYPE {full_name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full_name}{_format_labels(key)} {value}")
+            for name, series in sorted(self.histograms.items()):
+                full_name = self.prefix + name
+                lines.append(f"# TYPE {full_name} histogram")
+                for key, histogram in sorted(series.items()):
+                    for bound, count in zip(histogram['buckets'], histogram['counts']):
+                        lines.append(f"{full_name}_bucket{_format_labels(key, [('le', bound)])} {count}")
+                    lines.append(f"{full_name}_bucket{_format_labels(key, [('le', '+Inf')])} {histogram['count']}")
+                    lines.append(f"{full_name}_sum{_format_labels(key)} {histogram['sum']}")
+                    lines.append(f"{full_name}_count{_format_labels(key)} {histogram['count']}")
+            help_texts = dict(self.help)
+
+        for name, series in sorted(self._gauge_values().items()):
+            full_name = self.prefix + name
+            if name in help_texts:
+                lines.append(f"# HELP {full_name} {help_texts[name]}")
+            lines.append(f"# TYPE {full_name} gauge")
+            for key, value in sorted(series.items()):
+                lines.append(f"{full_name}{_format_labels(key)} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def progress_line(self):
+        """一行进度摘要：完成数、速率、失败分类、队列深度、池占用、缓存命中率、阶段平均耗时"""
+        elapsed = max(time.time() - self.start_time, 1e-6)
+        done = self.counter_value('entries_total')
+        failed = self.counter_value('entries_total', {'status': 'failed'})
+        gauges = self._gauge_values()
+        planned = sum(gauges.get('entries_planned', {}).values())
+
+        parts = [f"[进度] {done}/{planned or '?'} 条目", f"{done / elapsed:.2f} 条/秒", f"失败 {failed}"]
+
+        failures = {kind: count for kind, count in self.counter_by_label('failures_total', 'class').items() if count}
+        if failures:
+            parts.append("失败类型 " + ','.join(f"{kind}={count}" for kind, count in sorted(failures.items())))
+
+        depths = gauges.get('queue_depth', {})
+        if depths:
+            parts.append("队列 " + ','.join(f"{dict(key).get('lane')}={value}" for key, value in sorted(depths.items())))
+
+        pool = gauges.get('browser_pool_in_use', {}).get(())
+        pool_size = gauges.get('browser_pool_size', {}).get(())
+        if pool is not None and pool_size:
+            parts.append(f"浏览器池 {pool}/{pool_size}")
+
+        hits = self.counter_by_label('cache_requests_total', 'result')
+        total_lookups = sum(hits.values())
+        if total_lookups:
+            parts.append(f"缓存命中率 {hits.get('hit', 0) / total_lookups:.0%}")
+
+        for stage in ('fetch', 'analysis', 'write'):
+            mean = self.histogram_mean('stage_seconds', 'stage', stage)
+            if mean is not None:
+                parts.append(f"{stage} {mean:.2f}s")
+
+        return ' | '.join(parts)
+
+
+def start_metrics_server(metrics, port, host='127.0.0.1'):
+    """在本地端口上以Prometheus文本格式暴露指标（/metrics），后台线程运行"""
+    # 开启指标端口时才导入http.server，缩短普通运行的启动时间
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class ProgressReporter:
+    """后台线程，每隔interval秒输出一行进度摘要"""
+
+    def __init__(self, metrics, interval=30.0):
+        self.metrics = metrics
+        self.interval = interval
+        self._stop = Event()
+        self._thread = Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            logger.info(self.metrics.progress_line())
+
+    def stop(self):
+        self._stop.set()
+
+
+# 全局指标注册表
+metrics = Metrics()
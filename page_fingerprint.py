@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import re
+import time
+from threading import Lock
+
+
+# 不参与结构指纹的标签：脚本、样式和元信息经常随统计代码、版本号变化，与页面布局无关
+IGNORED_TAGS = {'script', 'style', 'noscript', 'link', 'meta', 'template'}
+_DIGITS = re.compile(r'\d+')
+
+
+def _node_token(element):
+    """单个节点的结构标记：标签 + 排序后的class（数字统一替换，忽略文本和其他属性）"""
+    classes = sorted(set(_DIGITS.sub('#', element.get('class', '')).split()))
+    return element.tag + ('.' + '.'.join(classes) if classes else '')
+
+
+def structural_fingerprint(page_tree):
+    """计算页面的结构指纹（标签/class骨架的哈希），只依赖布局，不依赖文字内容
+
+    连续重复的同结构兄弟节点（列表项、表格行、段落）合并为一个，
+    因此列表条数或正文段落数变化不会改变指纹。迭代后序遍历，不受页面深度限制。
+    """
+    bodies = page_tree.xpath('//body')
+    root = bodies[0] if bodies else page_tree
+
+    signatures = {}
+    stack = [(root, False)]
+    while stack:
+        element, visited = stack.pop()
+        children = [child for child in element
+                    if isinstance(child.tag, str) and child.tag not in IGNORED_TAGS]
+        if not visited:
+            stack.append((element, True))
+            stack.extend((child, False) for child in children)
+            continue
+
+        child_signatures = []
+        for child in children:
+            signature = signatures.pop(child)
+            if not child_signatures or child_signatures[-1] != signature:
+                child_signatures.append(signature)
+        skeleton = _node_token(element) + '(' + ','.join(child_signatures) + ')'
+        signatures[element] = hashlib.sha1(skeleton.encode('utf-8')).hexdigest()
+
+    return signatures[root]
+
+
+class FingerprintIndex:
+    """结构指纹索引：任务键 -> 上次分析时的 {fingerprint, xpath, xpathList4Click}，保存为JSON文件
+
+    下次运行时页面指纹不变，说明布局没变，可以直接复用上次的XPath（快速验证后）而不必重新评分。
+    """
+
+    def __init__(self, path, save_every=50):
+        self.path = path
+        self.save_every = save_every
+        self.lock = Lock()
+        self.entries = {}
+        self._dirty = 0
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def lookup(self, key):
+        with self.lock:
+            return self.entries.get(key)
+
+    def update(self, key, result):
+        """记录成功结果的指纹和XPath；没有指纹或失败的结果不记录"""
+        if result.get('status') != 'success' or not result.get('fingerprint') or not result.get('xpath'):
+            return
+        with self.lock:
+            self.entries[key] = {
+                'fingerprint': result['fingerprint'],
+                'xpath': result['xpath'],
+                'xpathList4Click': result.get('xpathList4Click'),
+                'updated': time.time(),
+            }
+            self._dirty += 1
+            if self._dirty >= self.save_every:
+                self._save_locked()
+
+    def _save_locked(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._dirty = 0
+
+    def close(self):
+        with self.lock:
+            if self._dirty:
+                self._save_locked()
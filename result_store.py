@@ -0,0 +1,211 @@
+import json
+import sqlite3
+import time
+from threading import Lock
+from urllib.parse import urlparse
+
+from result_writer import write_output_file_atomic
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      INTEGER PRIMARY KEY,
+    started_at  REAL NOT NULL,
+    finished_at REAL,
+    description TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    entry_id        INTEGER PRIMARY KEY,
+    run_id          INTEGER NOT NULL REFERENCES runs(run_id),
+    input_file      TEXT,
+    position        INTEGER,
+    name            TEXT NOT NULL,
+    url             TEXT NOT NULL,
+    host            TEXT NOT NULL,
+    status          TEXT NOT NULL,
+    xpath           TEXT,
+    xpath_list_4click TEXT,
+    finished_at     REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    entry_id   INTEGER NOT NULL REFERENCES entries(entry_id),
+    attempt    INTEGER NOT NULL,
+    xpath      TEXT,
+    validation TEXT
+);
+CREATE TABLE IF NOT EXISTS fetches (
+    entry_id INTEGER NOT NULL REFERENCES entries(entry_id),
+    tier     TEXT,
+    attempts INTEGER,
+    error    TEXT
+);
+CREATE TABLE IF NOT EXISTS timings (
+    entry_id INTEGER NOT NULL REFERENCES entries(entry_id),
+    stage    TEXT NOT NULL,
+    seconds  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS xpaths (
+    entry_id INTEGER NOT NULL REFERENCES entries(entry_id),
+    kind     TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    xpath    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    entry_id    INTEGER NOT NULL REFERENCES entries(entry_id),
+    fingerprint TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_run ON entries(run_id);
+CREATE INDEX IF NOT EXISTS idx_entries_host ON entries(host, run_id);
+CREATE INDEX IF NOT EXISTS idx_entries_status ON entries(status, run_id);
+CREATE INDEX IF NOT EXISTS idx_entries_url ON entries(url, run_id);
+CREATE INDEX IF NOT EXISTS idx_attempts_entry ON attempts(entry_id);
+CREATE INDEX IF NOT EXISTS idx_fetches_entry ON fetches(entry_id);
+CREATE INDEX IF NOT EXISTS idx_fetches_tier ON fetches(tier);
+CREATE INDEX IF NOT EXISTS idx_timings_entry ON timings(entry_id, stage);
+CREATE INDEX IF NOT EXISTS idx_xpaths_entry ON xpaths(entry_id);
+CREATE INDEX IF NOT EXISTS idx_fingerprints_entry ON fingerprints(entry_id);
+CREATE INDEX IF NOT EXISTS idx_fingerprints_value ON fingerprints(fingerprint);
+"""
+
+
+class ResultStore:
+    """SQLite结果库：按运行批次记录条目、分析尝试、获取方式、耗时和最终XPath"""
+
+    def __init__(self, db_path, batch_size=100):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.lock = Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.run_id = None
+        self._buffer = []
+
+    def start_run(self, description=""):
+        """开始一个新的运行批次，返回run_id"""
+        with self.lock:
+            cursor = self.conn.execute("INSERT INTO runs (started_at, description) VALUES (?, ?)",
+                                       (time.time(), description))
+            self.conn.commit()
+            self.run_id = cursor.lastrowid
+        return self.run_id
+
+    def add_result(self, result, input_file=None, position=None):
+        """缓存一个结果，攒够batch_size条后批量写入"""
+        with self.lock:
+            self._buffer.append((result, input_file, position))
+            if len(self._buffer) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+
+        attempt_rows, fetch_rows, timing_rows, xpath_rows, fingerprint_rows = [], [], [], [], []
+        with self.conn:
+            for result, input_file, position in self._buffer:
+                click_list = result.get('xpathList4Click') or []
+                # entry_id由SQLite分配：多个进程写同一个库时也不会冲突
+                cursor = self.conn.execute(
+                    "INSERT INTO entries (run_id, input_file, position, name, url, host, status, xpath, "
+                    "xpath_list_4click, finished_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.run_id, input_file, position, result['name'], result['url'],
+                     urlparse(result['url']).netloc.lower(), result.get('status') or 'failed',
+                     result.get('xpath'), json.dumps(click_list, ensure_ascii=False), time.time()))
+                entry_id = cursor.lastrowid
+                for attempt in result.get('attempts') or []:
+                    attempt_rows.append((entry_id, attempt['attempt'], attempt.get('xpath'), attempt.get('validation')))
+                fetch = result.get('fetch')
+                if fetch:
+                    fetch_rows.append((entry_id, fetch.get('tier'), fetch.get('attempts'), fetch.get('error')))
+                for stage, seconds in (result.get('timings') or {}).items():
+                    timing_rows.append((entry_id, stage, seconds))
+                if result.get('xpath'):
+                    xpath_rows.append((entry_id, 'container', 0, result['xpath']))
+                for i, click_xpath in enumerate(click_list):
+                    xpath_rows.append((entry_id, 'click', i, click_xpath))
+                if result.get('fingerprint'):
+                    fingerprint_rows.append((entry_id, result['fingerprint']))
+
+            self.conn.executemany("INSERT INTO attempts VALUES (?, ?, ?, ?)", attempt_rows)
+            self.conn.executemany("INSERT INTO fetches VALUES (?, ?, ?, ?)", fetch_rows)
+            self.conn.executemany("INSERT INTO timings VALUES (?, ?, ?)", timing_rows)
+            self.conn.executemany("INSERT INTO xpaths VALUES (?, ?, ?, ?)", xpath_rows)
+            self.conn.executemany("INSERT INTO fingerprints VALUES (?, ?)", fingerprint_rows)
+        self._buffer = []
+
+    def finish_run(self):
+        """写入剩余缓存并记录批次结束时间"""
+        with self.lock:
+            self._flush_locked()
+            if self.run_id is not None:
+                with self.conn:
+                    self.conn.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), self.run_id))
+
+    def close(self):
+        self.finish_run()
+        self.conn.close()
+
+    def latest_run_id(self):
+        row = self.conn.execute("SELECT MAX(run_id) FROM runs").fetchone()
+        return row[0]
+
+    def load_results(self, run_id=None, input_file=None):
+        """读取某个批次（默认最新批次）的结果，按输入文件和输入顺序排列"""
+        if run_id is None:
+            run_id = self.latest_run_id()
+        sql = "SELECT name, url, status, xpath, xpath_list_4click FROM entries WHERE run_id = ?"
+        params = [run_id]
+        if input_file is not None:
+            sql += " AND input_file = ?"
+            params.append(input_file)
+        sql += " ORDER BY input_file, position, entry_id"
+
+        results = []
+        for name, url, status, xpath, click_json in self.conn.execute(sql, params):
+            results.append({
+                'name': name,
+                'url': url,
+                'status': status,
+                'xpath': xpath,
+                'xpathList4Click': json.loads(click_json) or None,
+            })
+        return results
+
+    def export_yaml(self, output_file, run_id=None, input_file=None):
+        """把某个批次的结果导出为原有的 ---/name/url/xpath/xpathList4Click 格式"""
+        results = self.load_results(run_id, input_file)
+        write_output_file_atomic(results, output_file)
+        return len(results)
+
+    def failed_hosts(self, run_id=None):
+        """统计某批次各站点的失败条目数"""
+        if run_id is None:
+            run_id = self.latest_run_id()
+        return self.conn.execute(
+            "SELECT host, COUNT(*) FROM entries WHERE run_id = ? AND status != 'success' "
+            "GROUP BY host ORDER BY COUNT(*) DESC", (run_id,)).fetchall()
+
+    def find_xpaths(self, fragment, run_id=None):
+        """查找XPath中包含指定片段（如nav）的条目"""
+        if run_id is None:
+            run_id = self.latest_run_id()
+        return self.conn.execute(
+            "SELECT name, url, xpath FROM entries WHERE run_id = ? AND xpath LIKE ?",
+            (run_id, f"%{fragment}%")).fetchall()
+
+    def changed_since(self, previous_run_id, run_id=None):
+        """对比两个批次，返回状态或XPath发生变化的条目"""
+        if run_id is None:
+            run_id = self.latest_run_id()
+        return self.conn.execute(
+            "SELECT cur.name, cur.url, prev.xpath, cur.xpath, prev.status, cur.status "
+            "FROM entries cur JOIN entries prev ON prev.url = cur.url AND prev.name = cur.name "
+            "WHERE cur.run_id = ? AND prev.run_id = ? "
+            "AND (COALESCE(prev.xpath, '') != COALESCE(cur.xpath, '') OR prev.status != cur.status)",
+            (run_id, previous_run_id)).fetchall()
@@ -0,0 +1,123 @@
+import os
+import time
+from threading import Lock
+
+
+def format_output_entry(result):
+    """把单个结果格式化为输出文件中的一个 --- 块"""
+    lines = [
+        "---\n",
+        f"name: {result['name']}\n",
+        f"url: {result['url']}\n",
+        f"xpath: \"{result.get('xpath', '')}\"\n",
+    ]
+    if result.get('xpathList4Click'):
+        lines.append("xpathList4Click:\n")
+        for xpath in result['xpathList4Click']:
+            safe_xpath = xpath.replace('"', '\\"').replace('\n', '\\n')
+            lines.append(f"  - \"{safe_xpath}\"\n")
+    else:
+        lines.append("xpathList4Click: []\n")
+    return ''.join(lines)
+
+
+def write_output_file_atomic(results, output_file):
+    """先写临时文件再替换，保证输出文件任何时刻都是完整的"""
+    tmp_file = output_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        for result in results:
+            f.write(format_output_entry(result))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, output_file)
+
+
+class IncrementalResultWriter:
+    """增量结果写入器：每完成一个条目就追加到输出文件，按批次fsync落盘"""
+
+    def __init__(self, output_file, fsync_every=10, fsync_interval=5.0, restore_order=True, append=False):
+        self.output_file = output_file
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.restore_order = restore_order
+        self.lock = Lock()
+        self.results = []
+        self._pending = 0
+        self._last_sync = time.time()
+        self._file = open(output_file, 'a' if append else 'w', encoding='utf-8')
+
+    def write(self, result, index=None):
+        """追加一个结果；整块一次写入，崩溃时最多丢失最后一个不完整的块"""
+        block = format_output_entry(result)
+        with self.lock:
+            self._file.write(block)
+            self._file.flush()
+            self.results.append((len(self.results) if index is None else index, result))
+            self._pending += 1
+            if self._pending >= self.fsync_every or time.time() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def add_existing(self, result, index):
+        """登记一个已在输出文件中的结果（断点续跑时跳过的条目），只参与最终排序"""
+        with self.lock:
+            self.results.append((index, result))
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.time()
+
+    def close(self, completed=True):
+        """关闭写入器；正常完成时按输入顺序原子地重写一次输出文件"""
+        with self.lock:
+            if self._file.closed:
+                return
+            self._sync()
+            self._file.close()
+            if completed and self.restore_order:
+                ordered = [result for _, result in sorted(self.results, key=lambda x: x[0])]
+                write_output_file_atomic(ordered, self.output_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(completed=exc_type is None)
+        return False
+
+
+def parse_output_file(output_file):
+    """解析已有的输出文件（包括中途崩溃留下的部分输出），返回结果列表"""
+    with open(output_file, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    results = []
+    for block in content.split('---\n'):
+        result = {}
+        click_list = None
+        for line in block.splitlines():
+            if line.startswith('name: '):
+                result['name'] = line[len('name: '):]
+            elif line.startswith('url: '):
+                result['url'] = line[len('url: '):].strip()
+            elif line.startswith('xpath: '):
+                xpath = line[len('xpath: '):].strip()
+                if len(xpath) >= 2 and xpath[0] == xpath[-1] == '"':
+                    xpath = xpath[1:-1]
+                result['xpath'] = xpath if xpath and xpath != 'None' else None
+            elif line.startswith('xpathList4Click:'):
+                click_list = []
+            elif click_list is not None and line.strip().startswith('- '):
+                item = line.strip()[2:].strip()
+                if len(item) >= 2 and item[0] == item[-1] == '"':
+                    item = item[1:-1]
+                click_list.append(item.replace('\\n', '\n').replace('\\"', '"'))
+
+        # 只有写到xpathList4Click行的块才是完整的块
+        if 'name' not in result or 'url' not in result or click_list is None:
+            continue
+        result['xpathList4Click'] = click_list or None
+        result['status'] = 'success' if result.get('xpath') else 'failed'
+        results.append(result)
+
+    return results
@@ -0,0 +1,13 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_library_use_writes_nothing_to_stderr():
+    # pytest自己会接管日志，在子进程里才能看到logging的stderr兜底输出
+    completed = subprocess.run([sys.executable, '-c', "from diagnostics import logger; logger.warning('库调用告警')"],
+                               cwd=ROOT, capture_output=True, text=True, check=True)
+
+    assert completed.stderr == ''
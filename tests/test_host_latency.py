@@ -0,0 +1,62 @@
+import time
+from threading import Event
+from types import SimpleNamespace
+
+import xpathFake
+
+PAGE = ('<html><head><title>通知公告</title></head><body>'
+        '<div class="top"><a href="/">首页</a><a href="/zwgk">政务公开</a></div>'
+        '<div class="list_box"><ul>'
+        + ''.join(f'<li><a href="/info/{i}.html">关于开展第{i}批项目申报工作的通知</a><span>2024-05-{i % 20 + 10:02d}</span></li>'
+                  for i in range(30))
+        + '</ul></div><div class="bt"><span>联系我们</span><span>版权所有</span></div></body></html>')
+
+
+class FakeDriver:
+    title = '通知公告'
+    page_source = PAGE
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def set_script_timeout(self, seconds):
+        pass
+
+    def get(self, url):
+        pass
+
+    def execute_script(self, script):
+        return 200
+
+
+class SlowPool:
+    """取WebDriver要排队很久，拿到之后页面很快"""
+
+    def __init__(self, wait_seconds):
+        self.wait_seconds = wait_seconds
+
+    def get_driver(self):
+        Event().wait(self.wait_seconds)
+        return FakeDriver()
+
+    def return_driver(self, driver):
+        pass
+
+
+def test_pool_wait_is_not_host_latency(monkeypatch):
+    released = []
+    monkeypatch.setattr(xpathFake, 'driver_pool', SlowPool(0.3))
+    # 跳过固定的渲染等待；只替换xpathFake里的time，不影响其他线程
+    monkeypatch.setattr(xpathFake, 'time', SimpleNamespace(time=time.time, sleep=lambda seconds: None))
+    monkeypatch.setattr(xpathFake.host_limiter, 'release',
+                        lambda host, latency, error_kind=None: released.append((host, latency, error_kind)))
+
+    result = xpathFake.process_entry({'name': 'latency-test', 'url': 'http://slowpool.example.cn/list.html'})
+
+    assert result['xpath'] == "//div[@class='list_box']"
+    assert len(released) == 1
+    host, latency, error_kind = released[0]
+    assert host == 'slowpool.example.cn'
+    assert error_kind is None
+    assert latency < 0.1
+    assert 'latency' not in result.get('fetch', {})
@@ -0,0 +1,39 @@
+import time
+from threading import Lock
+
+from xpathFake import create_entry_scheduler
+
+
+def test_js_lane_never_borrows_static_slots():
+    """静态通道空闲时也不能多开JS条目：JS通道严格不超过js_workers"""
+    scheduler = create_entry_scheduler(max_workers=1, js_workers=1)
+    lock = Lock()
+    running = {'js': 0, 'peak': 0}
+
+    def worker(entry):
+        with lock:
+            running['js'] += 1
+            running['peak'] = max(running['peak'], running['js'])
+        time.sleep(0.05)
+        with lock:
+            running['js'] -= 1
+        return entry
+
+    # 带html的条目不访问站点，不受站点并发限制
+    entries = [{'name': f'{i}js', 'url': f'http://js{i}.example.cn/', 'html': 'x'} for i in range(6)]
+    results = []
+    scheduler.run([('js', i, entry) for i, entry in enumerate(entries)], worker,
+                  lambda index, result: results.append(index))
+
+    assert sorted(results) == list(range(6))
+    assert running['peak'] == 1
+    assert scheduler.stats['js']['borrowed'] == 0
+
+
+def test_static_lane_still_borrows_idle_js_slots():
+    scheduler = create_entry_scheduler(max_workers=1, js_workers=1)
+    entries = [{'name': f's{i}', 'url': f'http://s{i}.example.cn/', 'html': 'x'} for i in range(4)]
+    scheduler.run([('static', i, entry) for i, entry in enumerate(entries)], lambda entry: time.sleep(0.05),
+                  lambda index, result: None)
+
+    assert scheduler.stats['static']['borrowed'] > 0
@@ -0,0 +1,103 @@
+import time
+from threading import Lock
+
+import xpathFake
+from webdriver_pool import WebDriverPool
+
+
+class FakeDriver:
+    def __init__(self):
+        self.closed = False
+
+    def quit(self):
+        self.closed = True
+
+
+def make_pool(size):
+    pool = WebDriverPool(pool_size=size, lazy=True)
+    pool._create_driver = FakeDriver
+    pool.start()
+    return pool
+
+
+def enter_pressure(monkeypatch):
+    # 软水位设为1MB，任何进程都会超过
+    monkeypatch.setattr(xpathFake.memory_governor, 'under_pressure', False)
+    monkeypatch.setattr(xpathFake.memory_governor, 'soft_limit', 1024 * 1024)
+    assert xpathFake.memory_governor.check(force=True)
+
+
+def leave_pressure(monkeypatch):
+    monkeypatch.setattr(xpathFake.memory_governor, 'soft_limit', 1024 ** 4)
+    assert not xpathFake.memory_governor.check(force=True)
+
+
+def test_pressure_halves_live_pool_and_recovers(monkeypatch):
+    pool = make_pool(4)
+    monkeypatch.setattr(xpathFake, 'driver_pool', pool)
+    monkeypatch.setattr(xpathFake, '_driver_pool_target_size', 4)
+    busy = pool.get_driver()
+
+    enter_pressure(monkeypatch)
+    # 三个空闲的关掉两个，正在使用的归还后不再关闭
+    assert pool.pool_size == 2
+    pool.return_driver(busy)
+    assert not busy.closed
+    assert pool.drivers.qsize() == 2
+
+    leave_pressure(monkeypatch)
+    assert pool.pool_size == 4
+    assert pool.drivers.qsize() == 4
+
+    enter_pressure(monkeypatch)
+    leave_pressure(monkeypatch)
+    assert pool.pool_size == 4
+
+
+def test_busy_drivers_are_closed_when_returned_after_shrink():
+    pool = make_pool(4)
+    drivers = [pool.get_driver() for _ in range(4)]
+
+    pool.shrink(1)
+    assert pool.pool_size == 4
+    for driver in drivers:
+        pool.return_driver(driver)
+
+    assert pool.pool_size == 1
+    assert pool.drivers.qsize() == 1
+    assert sum(driver.closed for driver in drivers) == 3
+
+
+def test_js_lane_held_back_under_pressure(monkeypatch):
+    scheduler = xpathFake.create_entry_scheduler(max_workers=1, js_workers=2)
+    xpathFake.attach_scheduler(scheduler)
+    lock = Lock()
+    running = {'js': 0, 'js_peak': 0, 'static': 0, 'overlap': 0}
+
+    def worker(entry):
+        lane = xpathFake.entry_lane(entry)
+        with lock:
+            running[lane] += 1
+            running['js_peak'] = max(running['js_peak'], running['js'])
+            if running['js'] and running['static']:
+                running['overlap'] += 1
+        time.sleep(0.05)
+        with lock:
+            running[lane] -= 1
+        return entry
+
+    entries = ([{'name': f'{i}js', 'url': f'http://js{i}.example.cn/', 'html': 'x'} for i in range(4)]
+               + [{'name': f's{i}', 'url': f'http://s{i}.example.cn/', 'html': 'x'} for i in range(4)])
+    try:
+        enter_pressure(monkeypatch)
+        scheduler.run([(xpathFake.entry_lane(entry), i, entry) for i, entry in enumerate(entries)], worker,
+                      lambda index, result: None)
+    finally:
+        xpathFake.detach_scheduler(scheduler)
+        monkeypatch.setattr(xpathFake.memory_governor, 'soft_limit', None)
+        monkeypatch.setattr(xpathFake.memory_governor, 'under_pressure', False)
+
+    # 内存紧张时JS条目只在调度器空闲时一个一个地派发
+    assert running['js_peak'] == 1
+    assert running['overlap'] == 0
+    assert scheduler.stats['js']['done'] == 4
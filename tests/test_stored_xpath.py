@@ -0,0 +1,30 @@
+from page_fingerprint import structural_fingerprint
+from xpathFake import check_stored_xpath, parse_html
+
+# 列表容器里混有一个带导航文字的工具条：原始页面上整体按首部扣分，去除干扰后是正常的列表
+PAGE = ('<html><head><title>通知公告</title></head><body>'
+        '<div class="top"><a href="/">首页</a><a href="/zwgk">政务公开</a></div>'
+        '<div class="list_box"><div class="tools"><a href="/m">手机版</a><a href="/bs">办事</a>'
+        '<a href="/zwfw">政务服务</a></div><ul>'
+        + ''.join(f'<li><a href="/info/{i}.html">关于开展第{i}批项目申报工作的通知</a><span>2024-05-{i % 20 + 10:02d}</span></li>'
+                  for i in range(30))
+        + '</ul></div><div class="bt"><span>联系我们</span><span>版权所有</span></div></body></html>')
+
+
+def test_stored_xpath_is_scored_on_cleaned_page():
+    tree = parse_html(PAGE)
+    fingerprint = structural_fingerprint(tree)
+
+    valid, message = check_stored_xpath(tree, "//div[@class='list_box']")
+
+    assert valid, message
+    # 预处理在副本上进行，调用方的树仍可用于计算结构指纹
+    assert structural_fingerprint(tree) == fingerprint
+
+
+def test_falls_back_to_raw_page_when_cleaning_removes_the_match():
+    # 顶部导航在清理后的页面上已被删除，回到原始页面上找到它，再按内容判断
+    valid, message = check_stored_xpath(parse_html(PAGE), "//div[@class='top']")
+
+    assert not valid
+    assert message.startswith("容器内容太少")
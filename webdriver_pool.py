@@ -1,16 +1,22 @@
-from queue import Queue
+from queue import Queue, Empty
 from threading import Lock
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 
 class WebDriverPool:
-    def __init__(self, pool_size=3):
+    def __init__(self, pool_size=3, lazy=False):
+        """lazy=True时不在创建时启动Chrome，第一次get_driver时才启动"""
         self.pool_size = pool_size
+        # 收缩时正在使用的driver归还后再关闭，直到池缩小到target_size
+        self.target_size = pool_size
         self.drivers = Queue()
         self.lock = Lock()
-        self._init_drivers()
+        self.started = False
+        if not lazy:
+            self.start()
     
     def _create_driver(self):
+        # 用到浏览器时才导入selenium，只做HTML分析时不加载浏览器相关模块
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
         chrome_options = Options()
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--disable-gpu")
@@ -25,11 +31,64 @@ class WebDriverPool:
             driver = self._create_driver()
             self.drivers.put(driver)
     
+    def start(self):
+        """启动池中所有driver（只启动一次）"""
+        with self.lock:
+            if not self.started:
+                self._init_drivers()
+                self.started = True
+    
     def get_driver(self):
+        if not self.started:
+            self.start()
         return self.drivers.get()
     
     def return_driver(self, driver):
-        self.drivers.put(driver)
+        with self.lock:
+            if self.pool_size > self.target_size:
+                self.pool_size -= 1
+            else:
+                self.drivers.put(driver)
+                return
+        try:
+            driver.quit()
+        except:
+            pass
+    
+    def in_use(self):
+        """当前被借出的driver数量"""
+        if not self.started:
+            return 0
+        return self.pool_size - self.drivers.qsize()
+    
+    def shrink(self, target_size):
+        """关闭空闲的driver，把池缩小到target_size；正在使用的driver归还时再关闭"""
+        with self.lock:
+            self.target_size = target_size
+            if not self.started:
+                self.pool_size = min(self.pool_size, target_size)
+                return
+            while self.pool_size > target_size:
+                try:
+                    driver = self.drivers.get_nowait()
+                except Empty:
+                    break
+                try:
+                    driver.quit()
+                except:
+                    pass
+                self.pool_size -= 1
+    
+    def grow(self, target_size):
+        """补充driver，把池恢复到target_size"""
+        with self.lock:
+            self.target_size = max(self.target_size, target_size)
+            if not self.started:
+                self.pool_size = max(self.pool_size, target_size)
+                return
+            while self.pool_size < target_size:
+                self.drivers.put(self._create_driver())
+                self.pool_size += 1
     
     def close_all(self):
         while not self.drivers.empty():
@@ -11,6 +11,7 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from concurrent.futures import ThreadPoolExecutor
 from webdriver_pool import WebDriverPool
+from dom_features import DomFeatures
 
 # 创建全局的WebDriver池
 driver_pool = WebDriverPool(pool_size=1)  # 根据机器性能调整池大小
@@ -336,28 +337,11 @@ def perform_second_level_cleaning(cleaned_body):
     """进行二次清理，基于DOM深度去除外层包装"""
     print("\n=== 开始二次清理 ===")
     
-    # 计算DOM深度
-    def get_dom_depth(element):
-        """计算DOM元素的深度"""
-        if element is None:
-            return 0
-        
-        # 获取所有子元素
-        children = element.xpath("./*")
-        if not children:
-            return 1
-        
-        # 计算最大子深度
-        max_child_depth = 0
-        for child in children:
-            child_depth = get_dom_depth(child)
-            if child_depth > max_child_depth:
-                max_child_depth = child_depth
-        
-        return max_child_depth + 1
+    # 计算DOM深度：一次迭代遍历算出所有元素的子树高度，清理前后都直接查表（不受递归深度限制）
+    dom_features = DomFeatures(cleaned_body)
     
     # 获取当前DOM深度
-    original_depth = get_dom_depth(cleaned_body)
+    original_depth = dom_features.height(cleaned_body)
     print(f"原始DOM深度: {original_depth}")
     
     # 如果深度较浅，不需要清理
@@ -410,7 +394,7 @@ def perform_second_level_cleaning(cleaned_body):
             break
     
     # 输出清理后的深度
-    new_depth = get_dom_depth(current_element)
+    new_depth = dom_features.height(current_element)
     print(f"清理后DOM深度: {new_depth}，实际移除了 {removed_layers} 层")
     
     # 输出清理后的HTML到终端
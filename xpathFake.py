@@ -1,22 +1,103 @@
+import copy
+import gc
+import importlib
+import logging
 import re
-import requests
 import time
 from queue import Queue
-from threading import Lock
-from lxml import html
-from yaml import SafeLoader
-from urllib.parse import urlparse
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, local
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+from functools import partial
 from webdriver_pool import WebDriverPool
+from result_writer import IncrementalResultWriter, parse_output_file
+from checkpoint import CheckpointLog, checkpoint_path, entry_key, load_completed_results
+from result_store import ResultStore
+from feature_export import FeatureExporter
+from lane_scheduler import LaneScheduler
+from host_limiter import AdaptiveHostLimiter, classify_error_page, classify_fetch_error
+from metrics import metrics, start_metrics_server, ProgressReporter
+from memory_governor import MemoryGovernor
+from page_fingerprint import FingerprintIndex, structural_fingerprint
+from dom_features import DomFeatures
+from analysis_memo import AnalysisMemo, content_digest
+from keyword_matcher import keyword_matcher
+from diagnostics import configure_logging, logger, trace_entry
 
-# 创建全局的WebDriver池
-driver_pool = WebDriverPool(pool_size=1)  # 根据机器性能调整池大小
 
-def get_html_content(url):
-    """获取网页HTML内容"""
+class _LazyModule:
+    """模块代理：第一次访问属性时才真正导入，--help、离线分析等用不到的依赖不拖慢启动"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+requests = _LazyModule('requests')
+html = _LazyModule('lxml.html')
+etree = _LazyModule('lxml.etree')
+
+
+_compiled_xpaths = local()
+
+
+def compiled_xpath(expression):
+    """按表达式缓存编译好的etree.XPath，只用于代码中固定的表达式（评分时对每个容器执行相同的表达式）；
+    compiled_xpath(expr)(element) 与 element.xpath(expr) 结果相同，但只编译一次。
+    etree.XPath对象求值时加锁，每个线程各自缓存一份，工作线程之间互不等待"""
+    cache = getattr(_compiled_xpaths, 'cache', None)
+    if cache is None:
+        cache = _compiled_xpaths.cache = {}
+    xpath = cache.get(expression)
+    if xpath is None:
+        xpath = cache[expression] = etree.XPath(expression)
+    return xpath
+
+
+def parse_html(html_content):
+    """解析页面：bytes按页面自身声明的编码解析；已解码的str编码为UTF-8后按UTF-8解析，
+    lxml不接受带 <?xml encoding=...?> 声明的str，且meta中的charset不能再用来解码已解码的文本"""
+    if isinstance(html_content, str):
+        return html.fromstring(html_content.encode('utf-8', 'replace'), parser=html.HTMLParser(encoding='utf-8'))
+    return html.fromstring(html_content)
+
+
+# 创建全局的WebDriver池
+# 第一次用Selenium获取页面时才启动Chrome，只做HTML分析时不启动浏览器；处理前按静态通道并发数调整大小（size_driver_pool）
+driver_pool = WebDriverPool(pool_size=1, lazy=True)
+# 按站点自适应并发（AIMD）：健康站点逐步放开，出现超时/限流/5xx时降速
+host_limiter = AdaptiveHostLimiter()
+
+# 内存水位控制（默认关闭，--memory-soft-mb开启）：每次超过软水位时暂停接收新条目，浏览器池按当前大小减半，
+# JS通道暂停派发（见attach_scheduler）
+memory_governor = MemoryGovernor()
+_driver_pool_target_size = driver_pool.pool_size
+memory_governor.on_pressure(lambda: driver_pool.shrink(max(1, driver_pool.pool_size // 2)))
+memory_governor.on_recovery(lambda: driver_pool.grow(_driver_pool_target_size))
+
+# 分析结果缓存：重试和重新获取到相同页面时复用，不重复分析；内存紧张时清空
+analysis_memo = AnalysisMemo()
+memory_governor.on_pressure(analysis_memo.clear)
+
+def size_driver_pool(max_workers):
+    """按静态通道的并发数设置WebDriver池大小（仍然懒启动），每个工作线程都有自己的Chrome可用；
+    内存回落后也恢复到这个大小"""
+    global _driver_pool_target_size
+    _driver_pool_target_size = max(1, max_workers)
+    driver_pool.grow(_driver_pool_target_size)
+
+metrics.register_gauge('browser_pool_size', lambda: driver_pool.pool_size, "WebDriver池大小")
+metrics.register_gauge('browser_pool_in_use', lambda: driver_pool.in_use(), "被借出的WebDriver数量")
+metrics.register_gauge('host_concurrency_limit',
+                       lambda: {(('host', host),): limit for host, limit in host_limiter.limits().items()},
+                       "各站点当前的自适应并发上限")
+
+def get_html_content(url, fetch_info=None):
+    """获取网页HTML内容；fetch_info不为空时记录失败的错误类型"""
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -24,73 +105,95 @@ def get_html_content(url):
         'Connection': 'keep-alive'
     }
     
+    request_start = time.time()
     try:
         response = requests.get(url, headers=headers, timeout=30)
         response.raise_for_status()
         
         return response.content
     except requests.exceptions.RequestException as e:
-        print(f"网络请求错误: {e}")
+        logger.warning("网络请求错误: %s", e)
+        if fetch_info is not None:
+            fetch_info['error'] = str(e)
+            fetch_info['error_kind'] = classify_fetch_error(e)
+        return None
+    finally:
+        if fetch_info is not None:
+            fetch_info['latency'] = time.time() - request_start
+
+def host_latency(fetch_info, fetch_start):
+    """交给站点限速的延迟：获取函数记录的站点响应耗时（不含等待WebDriver池和固定的渲染等待），
+    没有记录时用总耗时；取出后从fetch_info中删除，不写入结果"""
+    latency = fetch_info.pop('latency', None)
+    return latency if latency is not None else time.time() - fetch_start
+
+def navigation_status(driver):
+    """当前页面导航请求的HTTP状态码（Navigation Timing的responseStatus），浏览器不支持时返回None"""
+    try:
+        return driver.execute_script(
+            "const entry = performance.getEntriesByType('navigation')[0];"
+            "return entry && entry.responseStatus ? entry.responseStatus : null;")
+    except Exception:
         return None
 
-def get_html_content_Selenium(url, max_retries=4):
-    """使用 Selenium 获取页面内容"""
+def get_html_content_Selenium(url, max_retries=4, fetch_info=None):
+    """使用 Selenium 获取页面内容；fetch_info不为空时记录实际使用的获取方式、重试次数和站点响应耗时
+
+    站点响应耗时(latency)只计导航和读取页面源码，不含等待WebDriver池的时间和固定的渲染等待
+    """
+    if fetch_info is None:
+        fetch_info = {}
     for attempt in range(max_retries):
         driver = None
+        fetch_info['attempts'] = attempt + 1
+        navigation_seconds = 0.0
         try:
             driver = driver_pool.get_driver()
             driver.set_page_load_timeout(180)
             driver.set_script_timeout(180)
             
-            driver.get(url)
+            navigation_start = time.time()
+            try:
+                driver.get(url)
+            finally:
+                navigation_seconds = time.time() - navigation_start
             time.sleep(15)
             
+            source_start = time.time()
             html_content = driver.page_source
+            fetch_info['latency'] = navigation_seconds + time.time() - source_start
+            # 浏览器不会因为429/412/5xx抛出异常：按导航响应状态码或错误页标题识别，供站点限速降速
+            error_kind = classify_error_page(navigation_status(driver), driver.title)
             driver_pool.return_driver(driver)
+            fetch_info['tier'] = 'selenium'
+            fetch_info['error_kind'] = error_kind
+            if error_kind:
+                logger.warning("获取到错误页 (%s): %s", error_kind, url)
+                fetch_info['error'] = f"错误页: {error_kind}"
             return html_content
             
         except Exception as e:
-            print(f"获取页面失败 (尝试 {attempt + 1}/{max_retries}): {str(e)}")
+            logger.warning("获取页面失败 (尝试 %d/%d): %s", attempt + 1, max_retries, e)
+            fetch_info['error'] = str(e)
+            fetch_info['error_kind'] = classify_fetch_error(e)
+            fetch_info['latency'] = navigation_seconds
             if driver:
                 driver_pool.return_driver(driver)
             
             if attempt == max_retries - 1:
-                print("所有重试都失败，尝试使用备用方法")
-                return get_html_content(url)
+                logger.warning("所有重试都失败，尝试使用备用方法")
+                fetch_info['tier'] = 'requests'
+                return get_html_content(url, fetch_info)
                 
             time.sleep(5)
     
     return None
 def remove_header_footer_by_content_traceback(body):
     
-    # 首部内容特征关键词
-    header_content_keywords = [
-        '登录', '注册', '首页', '主页', '无障碍', '政务', '办事', '互动', 
-        '走进', '移动版', '手机版', '导航', '菜单', '搜索', '市政府',
-        'login', 'register', 'home', 'menu', 'search', 'nav'
-    ]
-    
-    # 尾部内容特征关键词
-    footer_content_keywords = [
-        '网站说明', '网站标识码', '版权所有', '主办单位', '承办单位', 
-        '技术支持', '联系我们', '网站地图', '隐私政策', '免责声明',
-        '备案号', 'icp', '公安备案', '政府网站', '网站管理',
-        'copyright', 'all rights reserved', 'powered by', 'designed by'
-    ]
-    
-    # 查找包含首部特征文字的元素
-    header_elements = []
-    for keyword in header_content_keywords:
-        xpath = f"//*[contains(text(), '{keyword}')]"
-        elements = body.xpath(xpath)
-        header_elements.extend(elements)
-    
-    # 查找包含尾部特征文字的元素
-    footer_elements = []
-    for keyword in footer_content_keywords:
-        xpath = f"//*[contains(text(), '{keyword}')]"
-        elements = body.xpath(xpath)
-        footer_elements.extend(elements)
+    # 查找包含首部/尾部特征文字的元素：一次遍历文档匹配所有关键词（关键词见keyword_matcher.KEYWORD_REGISTRY）
+    located = keyword_matcher.locate(body, 'header_content', 'footer_content')
+    header_elements = located['header_content']
+    footer_elements = located['footer_content']
     
     # 收集需要删除的容器
     containers_to_remove = set()
@@ -100,25 +203,22 @@ def remove_header_footer_by_content_traceback(body):
         container = find_header_footer_container(element)
         if container and container not in containers_to_remove:
             containers_to_remove.add(container)
-            print(f"发现首部容器: {container.tag} class='{container.get('class', '')[:50]}'")
+            logger.debug("发现首部容器: %s class='%s'", container.tag, container.get('class', '')[:50])
     
     # 处理尾部元素
     for element in footer_elements:
         container = find_footer_container_by_traceback(element)
         if container and container not in containers_to_remove:
             containers_to_remove.add(container)
-            print(f"发现尾部容器: {container.tag} class='{container.get('class', '')[:50]}'")
+            logger.debug("发现尾部容器: %s class='%s'", container.tag, container.get('class', '')[:50])
     
     # 额外检查：查找所有直接包含header/footer标签的div容器
-    header_divs = body.xpath(".//div[.//header] | .//div[.//footer] | .//div[.//nav]")
+    header_divs = compiled_xpath(".//div[.//header] | .//div[.//footer] | .//div[.//nav]")(body)
     for div in header_divs:
         # 检查这个div是否包含首部/尾部内容特征
-        div_text = div.text_content().lower()
-        
-        header_count = sum(1 for keyword in header_content_keywords if keyword in div_text)
-        footer_count = sum(1 for keyword in footer_content_keywords if keyword in div_text)
+        hits = keyword_matcher.match(div.text_content(), 'header_content', 'footer_content')
         
-        if header_count >= 2 or footer_count >= 2:
+        if len(hits['header_content']) >= 2 or len(hits['footer_content']) >= 2:
             if div not in containers_to_remove:
                 containers_to_remove.add(div)    
     # 删除容器
@@ -130,10 +230,11 @@ def remove_header_footer_by_content_traceback(body):
                 parent.remove(container)
                 removed_count += 1
         except Exception as e:
-            print(f"删除容器时出错: {e}")
+            logger.warning("删除容器时出错: %s", e)
     
     return body
 
+
 def find_header_footer_container(element):
     """通过回溯找到包含首部/尾部特征的容器 - 增强版"""
     current = element
@@ -175,26 +276,11 @@ def find_header_footer_container(element):
         
         # 检查这个div是否包含首部/尾部内容特征
         div_element = element.getparent()
-        div_text = div_element.text_content().lower()
-        
-        # 首部内容特征关键词
-        header_content_keywords = [
-            '登录', '注册', '首页', '主页', '无障碍', '政务', '办事', '互动', 
-            '走进', '移动版', '手机版', '导航', '菜单', '搜索', '市政府'
-        ]
-        
-        # 尾部内容特征关键词
-        footer_content_keywords = [
-            '网站说明', '网站标识码', '版权所有', '主办单位', '承办单位', 
-            '技术支持', '联系我们', '网站地图', '隐私政策', '免责声明',
-            '备案号', 'icp', '公安备案', '政府网站', '网站管理'
-        ]
         
         # 检查是否包含多个首部或尾部关键词
-        header_count = sum(1 for keyword in header_content_keywords if keyword in div_text)
-        footer_count = sum(1 for keyword in footer_content_keywords if keyword in div_text)
+        hits = keyword_matcher.match(div_element.text_content(), 'header_content_cn', 'footer_content_cn')
         
-        if header_count >= 2 or footer_count >= 2:
+        if len(hits['header_content_cn']) >= 2 or len(hits['footer_content_cn']) >= 2:
             return div_element
     
     # 如果没有找到明显的结构特征容器，返回直接父级容器
@@ -230,7 +316,8 @@ def find_footer_container_by_traceback(element):
 def preprocess_html_remove_interference(page_tree):
     
     # 获取body元素
-    body = page_tree.xpath("//body")[0] if page_tree.xpath("//body") else page_tree
+    bodies = compiled_xpath("//body")(page_tree)
+    body = bodies[0] if bodies else page_tree
     
     # 第一步：通过内容特征回溯删除首部和尾部容器
     body = remove_header_footer_by_content_traceback(body)
@@ -239,7 +326,7 @@ def preprocess_html_remove_interference(page_tree):
     interference_containers = []
     
     # 查找所有可能的干扰容器
-    all_containers = body.xpath(".//div | .//section | .//header | .//footer | .//nav | .//aside")
+    all_containers = compiled_xpath(".//div | .//section | .//header | .//footer | .//nav | .//aside")(body)
     
     for container in all_containers:
         if is_interference_container(container):
@@ -254,14 +341,14 @@ def preprocess_html_remove_interference(page_tree):
                 parent.remove(container)
                 removed_count += 1
         except Exception as e:
-            print(f"删除容器时出错: {e}")
+            logger.warning("删除容器时出错: %s", e)
     
     
-    # 输出清理后的HTML到终端
-    cleaned_html = html.tostring(body, encoding='unicode', pretty_print=True)
-    print("\n=== 清理后的HTML内容 ===")
-    print(cleaned_html[:2000] + "..." if len(cleaned_html) > 2000 else cleaned_html)
-    print("=== HTML内容结束 ===\n")
+    # 输出清理后的HTML（只在DEBUG级别开启时才序列化整棵树）
+    if logger.isEnabledFor(logging.DEBUG):
+        cleaned_html = html.tostring(body, encoding='unicode', pretty_print=True)
+        logger.debug("=== 清理后的HTML内容 ===\n%s\n=== HTML内容结束 ===",
+                     cleaned_html[:2000] + "..." if len(cleaned_html) > 2000 else cleaned_html)
     
     return body
 
@@ -276,35 +363,17 @@ def is_interference_container(container):
     if tag_name in ['header', 'footer', 'nav']:
         return True
     
-    # 强制删除的结构特征
-    strong_interference_keywords = [
-        'header', 'footer', 'nav', 'navigation', 'menu', 'menubar', 
-        'topbar', 'bottom', 'sidebar', 'aside', 'banner'
-    ]
-    
-    for keyword in strong_interference_keywords:
-        if keyword in classes or keyword in elem_id:
-            return True
-    
-    # 基于内容特征的删除判断
-    # 页面级header内容特征
-    header_content_patterns = [
-        '登录', '注册', '首页', '主页', '无障碍', '政务服务', '办事服务',
-        '互动交流', '走进', '移动版', '手机版', '导航', '菜单', '搜索',
-        'login', 'register', 'home', 'menu', 'search', 'nav'
-    ]
+    # 强制删除的结构特征（类名和ID拼在一起匹配，关键词不含换行，不会跨界命中）
+    if keyword_matcher.count(classes + '\n' + elem_id, 'interference_identifier', lower=False):
+        return True
     
-    # 页面级footer内容特征
-    footer_content_patterns = [
-        '网站说明', '网站标识码', '版权所有', '主办单位', '承办单位',
-        '技术支持', '联系我们', '网站地图', '隐私政策', '免责声明',
-        '备案号', 'icp', '公安备案', '政府网站', '网站管理',
-        'copyright', 'all rights reserved', 'powered by'
-    ]
+    # 基于内容特征的删除判断：页面级header/footer内容特征
+    hits = keyword_matcher.match(text_content, 'interference_header_content', 'interference_footer_content',
+                                 lower=False)
     
     # 计算内容特征匹配度
-    header_matches = sum(1 for pattern in header_content_patterns if pattern in text_content)
-    footer_matches = sum(1 for pattern in footer_content_patterns if pattern in text_content)
+    header_matches = len(hits['interference_header_content'])
+    footer_matches = len(hits['interference_footer_content'])
     
     # 如果包含多个header或footer特征词，认为是干扰容器
     if header_matches >= 3:
@@ -315,10 +384,10 @@ def is_interference_container(container):
     
     # 检查容器大小和内容密度
     text_length = len(text_content.strip())
-    child_count = len(container.xpath(".//*"))
+    child_count = len(compiled_xpath(".//*")(container))
     
     # 如果是小容器但包含很多链接，可能是导航
-    links = container.xpath(".//a")
+    links = compiled_xpath(".//a")(container)
     if text_length < 500 and len(links) > 8:
         link_text_ratio = sum(len(link.text_content()) for link in links) / max(text_length, 1)
         if link_text_ratio > 0.6:  # 链接文本占比超过60%
@@ -332,55 +401,89 @@ def find_article_container(page_tree):
     
     return main_content
 
-def find_main_content_in_cleaned_html(cleaned_body):
-    """在清理后的HTML中查找主内容区域"""
+def find_main_content_in_cleaned_html(cleaned_body, candidate_rows=None):
+    """在清理后的HTML中查找主内容区域
+    
+    candidate_rows不为空时，把每个候选容器的评分特征（含是否被选中）追加到该列表
+    """
+    candidate_features = {}
     
     # 获取所有可能的内容容器
-    content_containers = cleaned_body.xpath(".//div | .//section | .//article | .//main")
+    content_containers = compiled_xpath(".//div | .//section | .//article | .//main")(cleaned_body)
     
     if not content_containers:
-        print("未找到内容容器，返回body")
+        logger.info("未找到内容容器，返回body")
         return cleaned_body
     
     # 对容器进行评分，同时删除大幅度减分的标签
     scored_containers = []
     containers_to_remove = []
+    scores = {}
+    # 一次遍历算出所有容器的文字和计数特征，评分时查表，避免每个容器重新遍历子树
+    dom_features = DomFeatures(cleaned_body)
     
     for container in content_containers:
-        score = calculate_content_container_score(container)
+        features = {} if candidate_rows is not None else None
+        score = calculate_content_container_score(container, features, dom_features)
+        scores[container] = score
+        if features is not None:
+            features.update({'path': container.getroottree().getpath(container), 'score': score, 'removed': score < -100})
+            candidate_features[container] = features
         
         # 如果分数极低（大幅度减分），标记为删除
         if score < -100:
             containers_to_remove.append(container)
-            print(f"标记删除大幅减分容器: {container.tag} class='{container.get('class', '')[:30]}' 得分: {score}")
+            logger.debug("标记删除大幅减分容器: %s class='%s' 得分: %s", container.tag, container.get('class', '')[:30],
+                         score)
         elif score > -50:  # 只考虑分数不太低的容器
             scored_containers.append((container, score))
     
-    # 删除大幅度减分的标签
+    # 删除大幅度减分的标签，特征表同步更新；只有被删容器的祖先的特征会改变
     removed_count = 0
+    changed = set()
     for container in containers_to_remove:
         try:
             parent = container.getparent()
             if parent is not None:
-                parent.remove(container)
+                changed.update(dom_features.remove(container))
                 removed_count += 1
-                print(f"已删除干扰容器: {container.tag}")
+                logger.debug("已删除干扰容器: %s", container.tag)
         except Exception as e:
-            print(f"删除容器时出错: {e}")
+            logger.warning("删除容器时出错: %s", e)
     
-    print(f"共删除 {removed_count} 个大幅减分的干扰容器")
+    logger.debug("共删除 %d 个大幅减分的干扰容器", removed_count)
     
-    # 重新获取容器（删除干扰项后）
+    # 重新获取容器（删除干扰项后），只重新评分特征改变了的祖先容器，其余沿用删除前的得分
     if removed_count > 0:
-        content_containers = cleaned_body.xpath(".//div | .//section | .//article | .//main")
+        content_containers = compiled_xpath(".//div | .//section | .//article | .//main")(cleaned_body)
         scored_containers = []
+        # 随父容器一起被删除的后代容器也标记为已删除
+        for features in candidate_features.values():
+            features['removed'] = True
         for container in content_containers:
-            score = calculate_content_container_score(container)
+            if container in changed:
+                features = {} if candidate_rows is not None else None
+                score = calculate_content_container_score(container, features, dom_features)
+                if features is not None:
+                    candidate_features[container] = features
+            else:
+                score = scores[container]
+                features = candidate_features.get(container)
+            if features is not None:
+                # 删除兄弟节点后路径中的序号可能改变，路径总是重新计算
+                features.update({'path': container.getroottree().getpath(container), 'score': score, 'removed': False})
             if score > -50:
                 scored_containers.append((container, score))
     
+    if not content_containers:
+        # 所有容器都作为干扰项删除了
+        logger.info("删除干扰容器后没有剩余的内容容器")
+        collect_candidate_rows(candidate_rows, candidate_features, None)
+        return None
+
     if not scored_containers:
-        print("未找到正分容器，返回第一个容器")
+        logger.info("未找到正分容器，返回第一个容器")
+        collect_candidate_rows(candidate_rows, candidate_features, content_containers[0])
         return content_containers[0]
     
     # 选择得分最高的容器
@@ -406,23 +509,34 @@ def find_main_content_in_cleaned_html(cleaned_body):
     similar_score_containers = [(container, score) for container, score in scored_containers 
                                if abs(score - best_score) <= score_threshold]
     
-    print(f"找到 {len(similar_score_containers)} 个分数相近的容器:")
-    for i, (container, score) in enumerate(similar_score_containers):
-        print(f"容器{i+1}: {container.tag} class='{container.get('class', '')}' 得分: {score}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("找到 %d 个分数相近的容器:%s", len(similar_score_containers),
+                     ''.join(f"\n容器{i+1}: {container.tag} class='{container.get('class', '')}' 得分: {score}"
+                             for i, (container, score) in enumerate(similar_score_containers)))
     
     # 如果有多个分数相近的容器，选择层级最深的
     if len(similar_score_containers) > 1:
         # best_container = select_deepest_container_from_similar([c for c, s in similar_score_containers])
         # 选择最优的
-        best_container = select_best_container_prefer_child([c for c, s in similar_score_containers], scored_containers)
+        best_container = select_best_container_prefer_child([c for c, s in similar_score_containers], scored_containers,
+                                                            dom_features)
     else:
         best_container = scored_containers[0][0]
     # best_container = scored_containers[0][0]
     # 获取最终选择的容器分数
     final_score = next(score for container, score in scored_containers if container == best_container)
-    print(f"最终选择容器，得分: {final_score}")
-    print(f"容器信息: {best_container.tag} class='{best_container.get('class', '')}'")
+    logger.info("最终选择容器，得分: %s", final_score)
+    logger.info("容器信息: %s class='%s'", best_container.tag, best_container.get('class', ''))
+    collect_candidate_rows(candidate_rows, candidate_features, best_container)
     return best_container
+
+def collect_candidate_rows(candidate_rows, candidate_features, best_container):
+    """把候选容器的特征按文档顺序追加到candidate_rows，并标记最终选中的容器"""
+    if candidate_rows is None:
+        return
+    for container, features in candidate_features.items():
+        candidate_rows.append({**features, 'chosen': container is best_container})
+
 def is_child_of(child_element, parent_element):
     """检查child_element是否是parent_element的子节点"""
     current = child_element.getparent()
@@ -432,22 +546,30 @@ def is_child_of(child_element, parent_element):
         current = current.getparent()
     return False
 
-def select_best_container_prefer_child(similar_containers, all_scored_containers):
+def select_best_container_prefer_child(similar_containers, all_scored_containers, dom_features=None):
     """从分数相近的容器中选择最佳的，优先选择子节点"""
-    
-    # 检查容器之间的父子关系
+    if dom_features is None:
+        dom_features = DomFeatures(similar_containers[0].getroottree().getroot())
+    
+    # 检查容器之间的父子关系：按先序编号排序后用栈扫描一遍，栈中始终是当前容器在候选中的所有祖先
+    scores = dict(all_scored_containers)
+    intervals = dom_features.intervals
+    pairs = []
+    ancestors = []
+    for j in sorted(range(len(similar_containers)), key=lambda index: intervals[similar_containers[index]][0]):
+        first, _ = intervals[similar_containers[j]]
+        while ancestors and intervals[similar_containers[ancestors[-1]]][1] < first:
+            ancestors.pop()
+        pairs.extend((i, j) for i in ancestors)
+        ancestors.append(j)
+    
+    # 按原来两两比较的顺序(i, j)排列，后面的同分排序和父容器选择依赖这个顺序
     parent_child_pairs = []
-    
-    for i, container1 in enumerate(similar_containers):
-        for j, container2 in enumerate(similar_containers):
-            if i != j:
-                # 检查container2是否是container1的子节点
-                if is_child_of(container2, container1):
-                    # 获取两个容器的分数
-                    score1 = next(score for c, score in all_scored_containers if c == container1)
-                    score2 = next(score for c, score in all_scored_containers if c == container2)
-                    parent_child_pairs.append((container1, container2, score1, score2))
-                    print(f"发现父子关系: 父容器得分{score1}, 子容器得分{score2}")
+    for i, j in sorted(pairs):
+        container1, container2 = similar_containers[i], similar_containers[j]
+        score1, score2 = scores[container1], scores[container2]
+        parent_child_pairs.append((container1, container2, score1, score2))
+        logger.debug("发现父子关系: 父容器得分%s, 子容器得分%s", score1, score2)
     
     # 如果找到父子关系，需要更严格的判断
     if parent_child_pairs:
@@ -467,38 +589,40 @@ def select_best_container_prefer_child(similar_containers, all_scored_containers
             
             # 额外检查：确保选择的子节点确实比父节点更精确
             # 检查子节点的内容密度是否更高
-            child_text_length = len(best_child.text_content().strip())
+            child_text_length = dom_features.text_length(best_child)
             parent_candidates = [parent for parent, child, p_score, c_score in parent_child_pairs 
                                if child == best_child]
             
             if parent_candidates:
                 parent = parent_candidates[0]
-                parent_text_length = len(parent.text_content().strip())
+                parent_text_length = dom_features.text_length(parent)
                 
                 # 如果子节点的内容长度不到父节点的60%，可能选择了错误的子节点
                 if child_text_length < parent_text_length * 0.6:
-                    print(f"子节点内容过少({child_text_length} vs {parent_text_length})，选择父节点")
+                    logger.debug("子节点内容过少(%d vs %d)，选择父节点", child_text_length, parent_text_length)
                     return parent
             
-            print(f"选择子容器: {best_child.tag} class='{best_child.get('class', '')}' (父子分差: {score_diff})")
+            logger.debug("选择子容器: %s class='%s' (父子分差: %s)", best_child.tag, best_child.get('class', ''), score_diff)
             return best_child
     
     # 如果没有合适的父子关系，使用原来的层级深度选择逻辑
-    return select_deepest_container_from_similar(similar_containers)
-def select_deepest_container_from_similar(similar_containers):
-    """从分数相近的容器中选择层级最深的一个"""
+    return select_deepest_container_from_similar(similar_containers, dom_features)
+def select_deepest_container_from_similar(similar_containers, dom_features=None):
+    """从分数相近的容器中选择层级最深的一个；层级深度从DomFeatures特征表中查"""
     if not similar_containers:
         return None
     
     if len(similar_containers) == 1:
         return similar_containers[0]
+    if dom_features is None:
+        dom_features = DomFeatures(similar_containers[0].getroottree().getroot())
     
     # 计算每个容器的层级深度
     container_depths = []
     for container in similar_containers:
-        depth = calculate_container_depth(container)
+        depth = dom_features.depth(container)
         container_depths.append((container, depth))
-        print(f"  候选容器层级深度: {depth} - {container.tag} class='{container.get('class', '')}'")
+        logger.debug("  候选容器层级深度: %d - %s class='%s'", depth, container.tag, container.get('class', ''))
     
     # 按层级深度排序（深度越大，层级越深）
     container_depths.sort(key=lambda x: x[1], reverse=True)
@@ -507,33 +631,23 @@ def select_deepest_container_from_similar(similar_containers):
     deepest_container = container_depths[0][0]
     deepest_depth = container_depths[0][1]
     
-    print(f"选择最深层容器 (深度 {deepest_depth}): {deepest_container.tag} class='{deepest_container.get('class', '')}'")
+    logger.debug("选择最深层容器 (深度 %d): %s class='%s'", deepest_depth, deepest_container.tag,
+                 deepest_container.get('class', ''))
     return deepest_container
 
-def calculate_container_depth(container):
-    """计算容器距离body的层级深度"""
-    depth = 0
-    current = container
-    
-    # 向上遍历直到body或html
-    while current is not None and current.tag not in ['body', 'html']:
-        depth += 1
-        current = current.getparent()
-        if current is None:
-            break
-    
-    return depth
-def select_best_from_same_score_containers(containers):
+def select_best_from_same_score_containers(containers, dom_features=None):
     """从得分相同的多个容器中选择层级最深的一个（儿子容器）"""
+    if dom_features is None:
+        dom_features = DomFeatures(containers[0].getroottree().getroot())
     # 检查容器之间的层级关系，选择层级最深的
     container_depths = []
     
     for container in containers:
-        # 计算容器的层级深度（距离body的层级数）
-        depth = calculate_container_depth(container)
+        # 容器的层级深度（距离body的层级数）
+        depth = dom_features.depth(container)
         container_depths.append((container, depth))
         
-        print(f"容器层级深度: {depth} - {container.tag} class='{container.get('class', '')[:30]}'")
+        logger.debug("容器层级深度: %d - %s class='%s'", depth, container.tag, container.get('class', '')[:30])
     
     # 按层级深度排序（深度越大，层级越深）
     container_depths.sort(key=lambda x: x[1], reverse=True)
@@ -542,91 +656,107 @@ def select_best_from_same_score_containers(containers):
     best_container = container_depths[0][0]
     best_depth = container_depths[0][1]
     
-    print(f"选择层级最深的容器 (深度 {best_depth}): {best_container.tag} class='{best_container.get('class', '')[:30]}'")
+    logger.debug("选择层级最深的容器 (深度 %d): %s class='%s'", best_depth, best_container.tag,
+                 best_container.get('class', '')[:30])
     
     return best_container
 
-def calculate_container_depth(container):
-    """计算容器距离body的层级深度"""
-    depth = 0
-    current = container
-    
-    # 向上遍历直到body或html
-    while current is not None and current.tag not in ['body', 'html']:
-        depth += 1
-        current = current.getparent()
-        if current is None:
-            break
-    
-    return depth
-def calculate_content_container_score(container):
-    """计算内容容器得分 - 专注于识别真正的内容区域，大幅度减分干扰标签"""
+# 内容容器评分的内容特征：(特征名, 预编译正则, 分值)，模块加载时编译一次（共同前缀已提取，匹配的文字不变）
+CONTENT_INDICATORS = [
+    # 时间特征
+    ('时间特征', re.compile(r'\d{4}(?:-\d{2}-\d{2}|年\d{1,2}月\d{1,2}日|/\d{1,2}/\d{1,2})|发布时间|更新日期|发布日期|成文日期'), 30),
+    # 公文特征
+    ('公文特征', re.compile(r'通知|公告|意见|办法|规定|措施|方案|决定|指导|实施'), 40),
+    # 条款特征
+    ('条款特征', re.compile(r'第[一二三四五六七八九十\d]+[条章节]'), 35),
+    # 政务信息特征
+    ('政务信息', re.compile(r'索引号|主题分类|发文机关|发文字号|有效性'), 25),
+    # 附件特征
+    ('附件特征', re.compile(r'附件|下载|pdf|doc|docx|文件下载'), 20),
+    # 内容结构特征
+    ('内容结构', re.compile(r'为了|根据|按照|依据|现将|特制定|现印发|请结合实际'), 30),
+    # 新闻内容特征
+    ('新闻特征', re.compile(r'记者|报道|消息|新闻|采访|发表|刊登'), 25),
+    # 正文内容特征
+    ('正文特征', re.compile(r'正文|内容|详情|全文|摘要|概述'), 20),
+]
+
+# 列表容器评分的精确时间特征：YYYY-MM-DD、完整的中文日期、YYYY/MM/DD和时间字样合并为一个正则，一次扫描计数
+PRECISE_TIME_PATTERN = re.compile(r'\d{4}(?:-\d{2}-\d{2}|年\d{1,2}月\d{1,2}日|/\d{1,2}/\d{1,2})|发布时间|更新日期|发布日期|创建时间')
+
+def calculate_content_container_score(container, features=None, dom_features=None):
+    """计算内容容器得分 - 专注于识别真正的内容区域，大幅度减分干扰标签
+    
+    features不为空时，把评分用到的各项特征写入该字典（用于导出调参数据）；
+    dom_features为包含该容器的DomFeatures特征表，为空时只对该容器的子树计算一次
+    """
     score = 0
+    # 调试信息只在DEBUG级别开启时才构建
+    debug = logger.isEnabledFor(logging.DEBUG)
     debug_info = []
+    if features is None:
+        features = {}
+    if dom_features is None:
+        dom_features = DomFeatures(container)
     
     classes = container.get('class', '').lower()
     elem_id = container.get('id', '').lower()
-    text_content = container.text_content()
-    text_length = len(text_content.strip())
+    text_content = dom_features.text_of(container)
+    text_length = dom_features.text_length(container)
+    features.update({'tag': container.tag, 'class': container.get('class', ''), 'id': container.get('id', ''),
+                     'text_length': text_length, 'link_count': dom_features.link_count(container),
+                     'link_text_length': dom_features.link_text_length(container)})
     
     # 首先进行大幅度减分检查 - 直接排除干扰标签
     # 1. 检查标签名 - 直接排除
     if container.tag.lower() in ['header', 'footer', 'nav', 'aside']:
         score -= 500  # 极大减分，基本排除
-        debug_info.append(f"干扰标签: -{500} ({container.tag})")
+        if debug:
+            debug_info.append(f"干扰标签: -{500} ({container.tag})")
         return score  # 直接返回，不再计算其他分数
     
     # 2. 检查强烈的干扰类名/ID - 大幅减分
-    strong_interference_keywords = [
-        'header', 'footer', 'nav', 'navigation', 'menu', 'menubar', 
-        'topbar', 'bottom', 'sidebar', 'aside', 'banner', 'ad', 'advertisement'
-    ]
-    
-    interference_count = 0
-    for keyword in strong_interference_keywords:
-        if keyword in classes or keyword in elem_id:
-            interference_count += 1
+    # 类名和ID拼在一起一次匹配（关键词不含换行，不会跨界命中），正面特征在第7步使用
+    identifier_hits = keyword_matcher.match(classes + '\n' + elem_id, 'strong_interference_identifier',
+                                            'positive_identifier', lower=False)
+    interference_count = len(identifier_hits['strong_interference_identifier'])
+    features['interference_hits'] = interference_count
     
     if interference_count > 0:
         interference_penalty = interference_count * 200  # 每个干扰关键词减200分
         score -= interference_penalty
-        debug_info.append(f"强干扰特征: -{interference_penalty} (发现{interference_count}个)")
+        if debug:
+            debug_info.append(f"强干扰特征: -{interference_penalty} (发现{interference_count}个)")
         
         # 如果干扰特征太多，直接返回负分
         if interference_count >= 2:
             return score
     
     # 3. 检查内容特征 - 识别首部尾部内容
-    header_content_keywords = [
-        '登录', '注册', '首页', '主页', '无障碍', '政务', '办事', '互动', 
-        '走进', '移动版', '手机版', '导航', '菜单', '搜索', '市政府',
-        'login', 'register', 'home', 'menu', 'search', 'nav'
-    ]
-    
-    footer_content_keywords = [
-        '网站说明', '网站标识码', '版权所有', '主办单位', '承办单位', 
-        '技术支持', '联系我们', '网站地图', '隐私政策', '免责声明',
-        '备案号', 'icp', '公安备案', '政府网站', '网站管理',
-        'copyright', 'all rights reserved', 'powered by', 'designed by'
-    ]
-    
-    header_content_count = sum(1 for keyword in header_content_keywords if keyword in text_content.lower())
-    footer_content_count = sum(1 for keyword in footer_content_keywords if keyword in text_content.lower())
+    content_hits = keyword_matcher.match(text_content, 'header_content', 'footer_content')
+    header_content_count = len(content_hits['header_content'])
+    footer_content_count = len(content_hits['footer_content'])
+    features['header_hits'] = header_content_count
+    features['footer_hits'] = footer_content_count
     
     # 大幅减分首部尾部内容
     if header_content_count >= 3:
         score -= 300
-        debug_info.append(f"首部内容: -300 (发现{header_content_count}个关键词)")
+        if debug:
+            debug_info.append(f"首部内容: -300 (发现{header_content_count}个关键词)")
     elif header_content_count >= 2:
         score -= 150
-        debug_info.append(f"首部内容: -150 (发现{header_content_count}个关键词)")
+        if debug:
+            debug_info.append(f"首部内容: -150 (发现{header_content_count}个关键词)")
     
     if footer_content_count >= 3:
         score -= 300
-        debug_info.append(f"尾部内容: -300 (发现{footer_content_count}个关键词)")
+        if debug:
+            debug_info.append(f"尾部内容: -300 (发现{footer_content_count}个关键词)")
     elif footer_content_count >= 2:
         score -= 150
-        debug_info.append(f"尾部内容: -150 (发现{footer_content_count}个关键词)")
+        if debug:
+            debug_info.append(f"尾部内容: -150 (发现{footer_content_count}个关键词)")
     
     # 如果已经是严重负分，不再继续计算
     if score < -200:
@@ -635,100 +765,88 @@ def calculate_content_container_score(container):
     # 4. 基础内容长度评分
     if text_length > 1000:
         score += 50
-        debug_info.append("长内容: +50")
+        if debug:
+            debug_info.append("长内容: +50")
     elif text_length > 500:
         score += 35
-        debug_info.append("中等内容: +35")
+        if debug:
+            debug_info.append("中等内容: +35")
     elif text_length > 200:
         score += 20
-        debug_info.append("短内容: +20")
+        if debug:
+            debug_info.append("短内容: +20")
     elif text_length < 50:
         score -= 20
-        debug_info.append("内容太少: -20")
+        if debug:
+            debug_info.append("内容太少: -20")
     
     # 5. Role属性检查
     role = container.get('role', '').lower()
+    features['role'] = role
     if role == 'viewlist':
         score += 150
-        debug_info.append("Role特征: +150 (role='viewlist')")
+        if debug:
+            debug_info.append("Role特征: +150 (role='viewlist')")
     elif role in ['list', 'listbox', 'grid', 'main', 'article']:
         score += 50
-        debug_info.append(f"Role特征: +50 (role='{role}')")
+        if debug:
+            debug_info.append(f"Role特征: +50 (role='{role}')")
     
     # 6. 内容特征检测 - 不限于列表
-    content_indicators = [
-        # 时间特征
-        (r'\d{4}-\d{2}-\d{2}|\d{4}年\d{1,2}月\d{1,2}日|\d{4}/\d{1,2}/\d{1,2}|发布时间|更新日期|发布日期|成文日期', 30, '时间特征'),
-        # 公文特征
-        (r'通知|公告|意见|办法|规定|措施|方案|决定|指导|实施', 40, '公文特征'),
-        # 条款特征
-        (r'第[一二三四五六七八九十\d]+条|第[一二三四五六七八九十\d]+章|第[一二三四五六七八九十\d]+节', 35, '条款特征'),
-        # 政务信息特征
-        (r'索引号|主题分类|发文机关|发文字号|有效性', 25, '政务信息'),
-        # 附件特征
-        (r'附件|下载|pdf|doc|docx|文件下载', 20, '附件特征'),
-        # 内容结构特征
-        (r'为了|根据|按照|依据|现将|特制定|现印发|请结合实际', 30, '内容结构'),
-        # 新闻内容特征
-        (r'记者|报道|消息|新闻|采访|发表|刊登', 25, '新闻特征'),
-        # 正文内容特征
-        (r'正文|内容|详情|全文|摘要|概述', 20, '正文特征')
-    ]
-    
     total_content_score = 0
     matched_features = []
     
-    for pattern, weight, feature_name in content_indicators:
-        if re.search(pattern, text_content):
+    for feature_name, pattern, weight in CONTENT_INDICATORS:
+        if pattern.search(text_content):
             total_content_score += weight
             matched_features.append(feature_name)
     
+    features['content_features'] = ','.join(matched_features)
+    features['content_score'] = total_content_score
     if total_content_score > 0:
         final_content_score = min(total_content_score, 120)
         score += final_content_score
-        debug_info.append(f"内容特征: +{final_content_score} ({','.join(matched_features)})")
+        if debug:
+            debug_info.append(f"内容特征: +{final_content_score} ({','.join(matched_features)})")
     
     # 7. 正面类名/ID特征
-    positive_keywords = [
-        'content', 'main', 'article', 'news', 'data', 'info', 
-        'detail', 'result', 'list', 'body', 'text', 'container'
-    ]
-    
-    positive_matches = 0
-    for keyword in positive_keywords:
-        if keyword in classes or keyword in elem_id:
-            positive_matches += 1
+    positive_matches = len(identifier_hits['positive_identifier'])
     
+    features['positive_hits'] = positive_matches
     if positive_matches > 0:
         positive_score = min(positive_matches * 20, 60)
         score += positive_score
-        debug_info.append(f"正面特征: +{positive_score}")
+        if debug:
+            debug_info.append(f"正面特征: +{positive_score}")
     
     # 8. 结构化内容检测 - 不限于列表
-    structured_elements = container.xpath(".//p | .//h1 | .//h2 | .//h3 | .//h4 | .//h5 | .//h6 | .//li | .//table | .//div[contains(@class,'content')] | .//section")
-    if len(structured_elements) > 5:
-        structure_score = min(len(structured_elements) * 2, 40)
+    structured_count = dom_features.structured_count(container)
+    features['structured_count'] = structured_count
+    if structured_count > 5:
+        structure_score = min(structured_count * 2, 40)
         score += structure_score
-        debug_info.append(f"结构化内容: +{structure_score}")
+        if debug:
+            debug_info.append(f"结构化内容: +{structure_score}")
     
     # 9. 图片内容
-    images = container.xpath(".//img")
-    if len(images) > 0:
-        image_score = min(len(images) * 3, 20)
+    image_count = dom_features.image_count(container)
+    features['image_count'] = image_count
+    if image_count > 0:
+        image_score = min(image_count * 3, 20)
         score += image_score
-        debug_info.append(f"图片内容: +{image_score}")
+        if debug:
+            debug_info.append(f"图片内容: +{image_score}")
     
     # 输出调试信息
-    container_info = f"{container.tag} class='{classes[:30]}'"
-    print(f"容器评分: {score} - {container_info}")
-    for info in debug_info[:5]:
-        print(f"  {info}")
+    if debug:
+        logger.debug("容器评分: %s - %s class='%s'%s", score, container.tag, classes[:30],
+                     ''.join('\n  ' + info for info in debug_info[:5]))
     
     return score
 
 def exclude_page_header_footer(body):
     """排除页面级别的header和footer"""
-    children = body.xpath("./div | ./main | ./section | ./article")
+    children = compiled_xpath("./div | ./main | ./section | ./article")(body)
     
     if not children:
         return body
@@ -786,7 +904,7 @@ def find_middle_content(valid_children):
     scored_containers.sort(key=lambda x: x[1], reverse=True)
     best_container = scored_containers[0][0]
     
-    print(f"页面主体容器得分: {scored_containers[0][1]}")
+    logger.debug("页面主体容器得分: %s", scored_containers[0][1])
     return best_container
 
 def calculate_content_richness(container):
@@ -808,12 +926,12 @@ def calculate_content_richness(container):
         return -5
     
     # 检查图片数量
-    images = container.xpath(".//img")
+    images = compiled_xpath(".//img")(container)
     if len(images) > 0:
         score += min(len(images) * 3, 20)
     
     # 检查结构化内容
-    structured_elements = container.xpath(".//p | .//div[contains(@style, 'text-align')] | .//h1 | .//h2 | .//h3")
+    structured_elements = compiled_xpath(".//p | .//div[contains(@style, 'text-align')] | .//h1 | .//h2 | .//h3")(container)
     if len(structured_elements) > 0:
         score += min(len(structured_elements) * 2, 25)
     
@@ -821,7 +939,7 @@ def calculate_content_richness(container):
 
 def exclude_local_header_footer(container):
     """在容器内部排除局部的header和footer"""
-    children = container.xpath("./div | ./section | ./article")
+    children = compiled_xpath("./div | ./section | ./article")(container)
     
     if not children:
         return container
@@ -886,13 +1004,13 @@ def calculate_final_score(container):
         score += 5
     
     # 检查图片
-    images = container.xpath(".//img")
+    images = compiled_xpath(".//img")(container)
     if len(images) > 0:
         score += min(len(images) * 4, 25)
     
     # 检查结构化内容
-    styled_divs = container.xpath(".//div[contains(@style, 'text-align')]")
-    paragraphs = container.xpath(".//p")
+    styled_divs = compiled_xpath(".//div[contains(@style, 'text-align')]")(container)
+    paragraphs = compiled_xpath(".//p")(container)
     
     structure_count = len(styled_divs) + len(paragraphs)
     if structure_count > 0:
@@ -925,7 +1043,7 @@ def find_main_content_area(containers):
     candidates.sort(key=lambda x: x[1], reverse=True)
     main_area = candidates[0][0]
     
-    print(f"主内容区域得分: {candidates[0][1]}")
+    logger.debug("主内容区域得分: %s", candidates[0][1])
     return main_area
 
 def calculate_main_content_score(container):
@@ -946,7 +1064,7 @@ def calculate_main_content_score(container):
         return -5  # 内容太少
     
     # 检查是否包含丰富内容
-    images = container.xpath(".//img")
+    images = compiled_xpath(".//img")(container)
     if len(images) > 0:
         score += min(len(images) * 2, 15)
     
@@ -1019,12 +1137,13 @@ def find_list_container(page_tree):
     ]
     
     def count_list_items(element):
-        items = element.xpath(".//li | .//tr | .//article | .//div[contains(@class, 'item')]")
+        items = compiled_xpath(".//li | .//tr | .//article | .//div[contains(@class, 'item')]")(element)
         return len(items)
     
     def calculate_container_score(container):
         """计算容器作为目标列表的得分 - 第一轮严格过滤首部尾部"""
         score = 0
+        debug = logger.isEnabledFor(logging.DEBUG)
         debug_info = []
         
         # 获取容器的基本信息
@@ -1033,42 +1152,26 @@ def find_list_container(page_tree):
         role = container.get('role', '').lower()
         tag_name = container.tag.lower()
         text_content = container.text_content().lower()
+        content_hits = keyword_matcher.match(text_content, 'header_content', 'footer_content', lower=False)
         
         # 第一轮过滤：根据内容特征直接排除首部和尾部容器
         # 1. 检查首部特征内容
-        header_content_keywords = [
-            '登录', '注册', '首页', '主页', '无障碍', '政务', '办事', '互动', 
-            '走进', '移动版', '手机版', '导航', '菜单', '搜索', '市政府',
-            'login', 'register', 'home', 'menu', 'search', 'nav'
-        ]
-        
-        header_content_count = 0
-        for keyword in header_content_keywords:
-            if keyword in text_content:
-                header_content_count += 1
+        header_content_count = len(content_hits['header_content'])
         
         # 如果包含多个首部关键词，严重减分
         if header_content_count >= 2:
             score -= 300  # 极严重减分，基本排除
-            debug_info.append(f"首部内容特征: -300 (发现{header_content_count}个首部关键词)")
+            if debug:
+                debug_info.append(f"首部内容特征: -300 (发现{header_content_count}个首部关键词)")
         
         # 2. 检查尾部特征内容
-        footer_content_keywords = [
-            '网站说明', '网站标识码', '版权所有', '主办单位', '承办单位', 
-            '技术支持', '联系我们', '网站地图', '隐私政策', '免责声明',
-            '备案号', 'icp', '公安备案', '政府网站', '网站管理',
-            'copyright', 'all rights reserved', 'powered by', 'designed by'
-        ]
-        
-        footer_content_count = 0
-        for keyword in footer_content_keywords:
-            if keyword in text_content:
-                footer_content_count += 1
+        footer_content_count = len(content_hits['footer_content'])
         
         # 如果包含多个尾部关键词，严重减分
         if footer_content_count >= 2:
             score -= 300  # 极严重减分，基本排除
-            debug_info.append(f"尾部内容特征: -300 (发现{footer_content_count}个尾部关键词)")
+            if debug:
+                debug_info.append(f"尾部内容特征: -300 (发现{footer_content_count}个尾部关键词)")
         
         # 3. 检查结构特征 - footer/header标签和类名
         footer_structure_indicators = ['footer', 'foot', 'bottom', 'end', 'copyright', 'links', 'sitemap']
@@ -1076,7 +1179,8 @@ def find_list_container(page_tree):
             if (indicator in classes or indicator in elem_id or 
                 indicator in role or tag_name == 'footer'):
                 score -= 250  # 极严重减分
-                debug_info.append(f"Footer结构特征: -250 (发现'{indicator}')")
+                if debug:
+                    debug_info.append(f"Footer结构特征: -250 (发现'{indicator}')")
         
         # 4. 检查header/nav结构特征
         header_structure_indicators = ['header', 'nav', 'navigation', 'menu', 'topbar', 'banner', 'menubar']
@@ -1084,7 +1188,8 @@ def find_list_container(page_tree):
             if (indicator in classes or indicator in elem_id or 
                 indicator in role or tag_name in ['header', 'nav','menu']):
                 score -= 200  # 严重减分
-                debug_info.append(f"Header结构特征: -200 (发现'{indicator}')")
+                if debug:
+                    debug_info.append(f"Header结构特征: -200 (发现'{indicator}')")
         
         # 5. 检查祖先元素的负面特征（但权重降低，因为第一轮已经过滤了大部分）
         current = container
@@ -1099,14 +1204,16 @@ def find_list_container(page_tree):
                 if (indicator in parent_classes or indicator in parent_id or parent_tag == 'footer'):
                     penalty = max(60 - depth * 10, 15)  # 减少祖先特征的权重
                     score -= penalty
-                    debug_info.append(f"祖先Footer: -{penalty} (第{depth}层'{indicator}')")
+                    if debug:
+                        debug_info.append(f"祖先Footer: -{penalty} (第{depth}层'{indicator}')")
             
             # 检查祖先的header/nav特征
             for indicator in header_structure_indicators:
                 if (indicator in parent_classes or indicator in parent_id or parent_tag in ['header', 'nav']):
                     penalty = max(50 - depth * 8, 12)  # 减少祖先特征的权重
                     score -= penalty
-                    debug_info.append(f"祖先Header: -{penalty} (第{depth}层'{indicator}')")
+                    if debug:
+                        debug_info.append(f"祖先Header: -{penalty} (第{depth}层'{indicator}')")
             
             current = current.getparent()
             depth += 1
@@ -1117,41 +1224,36 @@ def find_list_container(page_tree):
         
         # 6. 正面特征评分 - 专注于内容质量
         # 检查时间特征（强正面特征）
-        precise_time_patterns = [
-            r'\d{4}-\d{2}-\d{2}',  # YYYY-MM-DD
-            r'\d{4}年\d{1,2}月\d{1,2}日',  # 完整的中文日期
-            r'\d{4}/\d{1,2}/\d{1,2}',  # YYYY/MM/DD
-            r'发布时间', r'更新日期', r'发布日期', r'创建时间'
-        ]
-        
-        precise_matches = 0
-        for pattern in precise_time_patterns:
-            matches = len(re.findall(pattern, text_content))
-            precise_matches += matches
+        precise_matches = len(PRECISE_TIME_PATTERN.findall(text_content))
         
         if precise_matches > 0:
             time_score = min(precise_matches * 30, 90)  # 增加时间特征权重
             score += time_score
-            debug_info.append(f"时间特征: +{time_score} ({precise_matches}个匹配)")
+            if debug:
+                debug_info.append(f"时间特征: +{time_score} ({precise_matches}个匹配)")
         
         # 7. 检查内容长度和质量
-        items = container.xpath(".//*[self::li or self::tr or self::article or self::div[contains(@class, 'item')]]")
+        items = compiled_xpath(".//*[self::li or self::tr or self::article or self::div[contains(@class, 'item')]]")(container)
         if items:
             total_length = sum(len(item.text_content().strip()) for item in items)
             avg_length = total_length / len(items) if items else 0
             
             if avg_length > 150:
                 score += 40  # 增加长内容的权重
-                debug_info.append(f"文本长度: +40 (平均{avg_length:.1f}字符)")
+                if debug:
+                    debug_info.append(f"文本长度: +40 (平均{avg_length:.1f}字符)")
             elif avg_length > 80:
                 score += 30
-                debug_info.append(f"文本长度: +30 (平均{avg_length:.1f}字符)")
+                if debug:
+                    debug_info.append(f"文本长度: +30 (平均{avg_length:.1f}字符)")
             elif avg_length > 40:
                 score += 20
-                debug_info.append(f"文本长度: +20 (平均{avg_length:.1f}字符)")
+                if debug:
+                    debug_info.append(f"文本长度: +20 (平均{avg_length:.1f}字符)")
             elif avg_length < 20:  # 文本太短，可能是导航
                 score -= 20
-                debug_info.append(f"文本长度: -20 (平均{avg_length:.1f}字符，太短)")
+                if debug:
+                    debug_info.append(f"文本长度: -20 (平均{avg_length:.1f}字符，太短)")
         
         # 8. 检查正面结构特征
         strong_positive_indicators = ['content', 'main', 'news', 'article', 'data', 'info', 'detail', 'result', 'list']
@@ -1159,58 +1261,58 @@ def find_list_container(page_tree):
         for indicator in strong_positive_indicators:
             if indicator in classes or indicator in elem_id:
                 positive_score += 25  # 增加正面特征权重
-                debug_info.append(f"正面特征: +25 ('{indicator}')")
+                if debug:
+                    debug_info.append(f"正面特征: +25 ('{indicator}')")
         
         score += min(positive_score, 75)  # 限制正面特征的最大加分
         
         # 9. 检查内容多样性（图片、链接等）
-        images = container.xpath(".//img")
-        links = container.xpath(".//a[@href]")
+        images = compiled_xpath(".//img")(container)
+        links = compiled_xpath(".//a[@href]")(container)
         
         if len(images) > 0:
             image_score = min(len(images) * 3, 20)
             score += image_score
-            debug_info.append(f"图片内容: +{image_score} ({len(images)}张图片)")
+            if debug:
+                debug_info.append(f"图片内容: +{image_score} ({len(images)}张图片)")
         
         if len(links) > 5:  # 有足够的链接说明是内容区域
             link_score = min(len(links) * 2, 30)
             score += link_score
-            debug_info.append(f"链接内容: +{link_score} ({len(links)}个链接)")
+            if debug:
+                debug_info.append(f"链接内容: +{link_score} ({len(links)}个链接)")
         
         # 10. 最后检查：避免导航类内容（但权重降低，因为第一轮已经过滤了大部分）
         if items and len(items) > 2:
             # 只检查明显的导航词汇，减少误判
-            strong_nav_words = ['登录', '注册', '首页', '主页', '联系我们', '关于我们']
             nav_word_count = 0
             
             for item in items[:8]:  # 减少检查的项目数
-                item_text = item.text_content().strip().lower()
-                for nav_word in strong_nav_words:
-                    if nav_word in item_text:
-                        nav_word_count += 1
-                        break
+                if keyword_matcher.count(item.text_content(), 'strong_nav_words'):
+                    nav_word_count += 1
             
             checked_items = min(len(items), 8)
             if nav_word_count > checked_items * 0.4:  # 提高阈值，减少误判
                 nav_penalty = 30  # 减少导航词汇的减分
                 score -= nav_penalty
-                debug_info.append(f"导航词汇: -{nav_penalty} ({nav_word_count}/{checked_items}个)")
+                if debug:
+                    debug_info.append(f"导航词汇: -{nav_penalty} ({nav_word_count}/{checked_items}个)")
         
         # 输出调试信息
-        container_info = f"标签:{tag_name}, 类名:{classes[:30]}{'...' if len(classes) > 30 else ''}"
-        if elem_id:
-            container_info += f", ID:{elem_id[:20]}{'...' if len(elem_id) > 20 else ''}"
-        
-        print(f"容器评分: {score} - {container_info}")
-        for info in debug_info[:6]:  # 显示更多调试信息
-            print(f"  {info}")
+        if debug:
+            container_info = f"标签:{tag_name}, 类名:{classes[:30]}{'...' if len(classes) > 30 else ''}"
+            if elem_id:
+                container_info += f", ID:{elem_id[:20]}{'...' if len(elem_id) > 20 else ''}"
+            # 显示更多调试信息
+            logger.debug("容器评分: %s - %s%s", score, container_info, ''.join('\n  ' + info for info in debug_info[:6]))
+
         
         return score
     
     # 第一层：找到所有可能的列表项
     all_items = []
     for selector in list_selectors:
-        items = page_tree.xpath(selector)
+        items = compiled_xpath(selector)(page_tree)
         all_items.extend(items)
     
     if not all_items:
@@ -1260,7 +1362,6 @@ def find_list_container(page_tree):
             while current is not None and depth < 4:  # 减少检查层级
                 classes = current.get('class', '').lower()
                 elem_id = current.get('id', '').lower()
-                text_content = current.text_content().lower()
                 
                 # 检查结构特征
                 negative_keywords = ['nav', 'menu', 'sidebar', 'header', 'topbar', 'navigation', 'head']
@@ -1270,13 +1371,7 @@ def find_list_container(page_tree):
                 
                 # 检查内容特征（只在前2层检查）
                 if depth < 2:
-                    footer_content_keywords = ['网站说明', '网站标识码', '版权所有', '备案号']
-                    header_content_keywords = ['登录', '注册', '首页', '无障碍']
-                    
-                    content_penalty = 0
-                    for keyword in footer_content_keywords + header_content_keywords:
-                        if keyword in text_content:
-                            content_penalty += 15
+                    content_penalty = 15 * keyword_matcher.count(current.text_content(), 'list_ancestry_content')
                     
                     if content_penalty > 30:  # 如果包含多个关键词
                         penalty += content_penalty
@@ -1329,7 +1424,6 @@ def find_list_container(page_tree):
                 parent_classes = current.get('class', '').lower()
                 parent_id = current.get('id', '').lower()
                 parent_tag = current.tag.lower()
-                parent_text = current.text_content().lower()
                 
                 # 检查结构负面关键词
                 structure_negative = ['footer', 'nav', 'menu', 'sidebar', 'header', 'topbar', 'navigation', 'foot', 'head']
@@ -1339,13 +1433,11 @@ def find_list_container(page_tree):
                 
                 # 检查内容负面特征（只在前2层检查，避免过度检查）
                 if depth < 2:
-                    # 首部内容特征
-                    header_content = ['登录', '注册', '首页', '主页', '无障碍', '政务', '办事', '互动', '走进']
-                    header_count = sum(1 for word in header_content if word in parent_text)
-                    
-                    # 尾部内容特征
-                    footer_content = ['网站说明', '网站标识码', '版权所有', '备案号', 'icp', '主办单位', '承办单位']
-                    footer_count = sum(1 for word in footer_content if word in parent_text)
+                    # 首部/尾部内容特征
+                    hits = keyword_matcher.match(current.text_content(), 'list_ancestor_header_content',
+                                                 'list_ancestor_footer_content')
+                    header_count = len(hits['list_ancestor_header_content'])
+                    footer_count = len(hits['list_ancestor_footer_content'])
                     
                     # 如果包含多个首部或尾部关键词，认为是负面祖先
                     if header_count >= 2:
@@ -1359,7 +1451,7 @@ def find_list_container(page_tree):
         
         # 如果父元素或其祖先包含负面特征，停止向上搜索
         if has_negative_ancestor(parent):
-            print("父级包含负面特征，停止向上搜索")
+            logger.debug("父级包含负面特征，停止向上搜索")
             break
             
         # 计算父元素中的列表项数量
@@ -1369,19 +1461,19 @@ def find_list_container(page_tree):
         parent_score = calculate_container_score(parent)
         current_score = calculate_container_score(current_container)
         
-        print(f"比较得分: 当前={current_score}, 父级={parent_score}")
-        print(f"项目数量: 当前={max_items}, 父级={parent_items}")
+        logger.debug("比较得分: 当前=%s, 父级=%s", current_score, parent_score)
+        logger.debug("项目数量: 当前=%s, 父级=%s", max_items, parent_items)
         
         should_upgrade = False
         
         # 首先检查父级是否有严重的负面特征
         if parent_score < -50:
-            print(f"父级得分过低({parent_score})，跳过升级")
+            logger.debug("父级得分过低(%s)，跳过升级", parent_score)
         else:
             # 条件1：父级得分明显更高且为正分
             if parent_score > current_score + 15 and parent_score > 10:
                 should_upgrade = True
-                print("父级得分明显更高且为正分，升级")
+                logger.debug("父级得分明显更高且为正分，升级")
             
             # 条件2：父级得分相近且为正分，包含合理数量的项目
             elif (parent_score >= current_score - 3 and 
@@ -1389,7 +1481,7 @@ def find_list_container(page_tree):
                   parent_items <= max_items * 2 and  # 更严格的项目数量限制
                   parent_items >= max_items):
                 should_upgrade = True
-                print("父级得分相近且为正分，升级")
+                logger.debug("父级得分相近且为正分，升级")
             
             # 条件3：当前容器项目太少，父级有合理数量且得分不错
             elif (max_items < 4 and 
@@ -1397,25 +1489,25 @@ def find_list_container(page_tree):
                   parent_items <= 15 and 
                   parent_score > 0):  # 要求父级必须是正分
                 should_upgrade = True
-                print("当前容器项目太少，升级到正分父级")
+                logger.debug("当前容器项目太少，升级到正分父级")
         
         if should_upgrade:
             current_container = parent
             max_items = parent_items
-            print("升级到父级容器")
+            logger.debug("升级到父级容器")
         else:
-            print("保持当前容器")
+            logger.debug("保持当前容器")
             break
         
         # 安全检查：如果父级项目数量过多，停止
         if parent_items > 50:
-            print(f"父级项目数量过多({parent_items})，停止向上搜索")
+            logger.debug("父级项目数量过多(%s)，停止向上搜索", parent_items)
             break
     
     # 最终验证：确保选择的容器包含足够的列表项且不是首部尾部
     final_items = count_list_items(current_container)
     final_score = calculate_container_score(current_container)
-    print(f"最终容器包含 {final_items} 个列表项，得分: {final_score}")
+    logger.info("最终容器包含 %s 个列表项，得分: %s", final_items, final_score)
     
     # 如果最终容器项目太少且得分不好，尝试向上找一层
     if final_items < 4 or final_score < -10:
@@ -1428,10 +1520,10 @@ def find_list_container(page_tree):
             if (parent_items > final_items and 
                 parent_score > 0 and  # 要求正分
                 parent_items <= 30):  # 避免选择过大的容器
-                print(f"最终调整：选择正分父级容器 (项目数: {parent_items}, 得分: {parent_score})")
+                logger.debug("最终调整：选择正分父级容器 (项目数: %s, 得分: %s)", parent_items, parent_score)
                 current_container = parent
             else:
-                print(f"父级不符合条件 (项目数: {parent_items}, 得分: {parent_score})，保持当前选择")
+                logger.debug("父级不符合条件 (项目数: %s, 得分: %s)，保持当前选择", parent_items, parent_score)
     
     return current_container
 def generate_xpath(element):
@@ -1542,14 +1634,17 @@ def is_interference_identifier(identifier):
     
     return False
 
-def validate_xpath(xpath, html_content):
-    """验证XPath是否返回有效结果（不检测列表）"""
+def validate_xpath(xpath, tree):
+    """验证XPath是否返回有效结果（不检测列表）；tree是已解析的lxml树，传入HTML文本时才重新解析"""
     try:
-        tree = html.fromstring(html_content)
+        if isinstance(tree, (str, bytes)):
+            tree = parse_html(tree)
+        # 每个页面生成的XPath只执行一次，不进入编译缓存
         results = tree.xpath(xpath)
+
         
         if not results:
-            return False, "未找到元素"
+            return False, "XPath未找到元素"
         
         # 只要找到元素就认为是有效的，不检测列表项数量
         return True, f"找到有效容器，标签: {results[0].tag}"
@@ -1601,7 +1696,6 @@ def get_robust_xpath(element):
     else:
         # 最后手段：仅使用标签
         return f"//{tag}"
-from DrissionPage import ChromiumPage
 import json
 def process_name(name_str):
     """处理name字段：去除js+智能分割标签"""
@@ -1617,9 +1711,10 @@ def process_name(name_str):
 def get_html_content_Drission(name, url):
     tab_list = process_name(name)
     if not tab_list:
-        print("警告：未解析出有效标签")
+        logger.warning("警告：未解析出有效标签")
         return {"html": "", "xpathList4Click": []}
 
+    from DrissionPage import ChromiumPage
     page = ChromiumPage()
     xpathList4Click = []
     
@@ -1627,7 +1722,7 @@ def get_html_content_Drission(name, url):
         page.get(url)
         
         for i, tab_text in enumerate(tab_list):
-            print(f"正在处理标签: {tab_text}")
+            logger.info("正在处理标签: %s", tab_text)
 
             xpath_strategies = [
                 f'xpath: //body//*[contains(text(),"{tab_text}") and name()!="script"]',
@@ -1644,7 +1739,7 @@ def get_html_content_Drission(name, url):
                     try:
                         tab_element = page.ele(strategy, timeout=5)
                         if tab_element:
-                            print(f"使用策略找到元素: {strategy}")
+                            logger.debug("使用策略找到元素: %s", strategy)
                             break
                     except Exception:
                         continue
@@ -1654,13 +1749,13 @@ def get_html_content_Drission(name, url):
                 tab_xpath = get_robust_xpath(tab_element)
                 xpathList4Click.append(tab_xpath)
                 tab_element.click(by_js=True)
-                print(f"已点击({i+1}/{len(tab_list)}): {tab_text} - XPath: {tab_xpath}")
+                logger.info("已点击(%d/%d): %s - XPath: %s", i + 1, len(tab_list), tab_text, tab_xpath)
                 
                 # 等待加载
                 page.wait.load_start()
                 page.wait(3)  # 稳定等待
             else:
-                print(f"⚠️ 未找到标签: '{tab_text}'，跳过后续操作")
+                logger.warning("⚠️ 未找到标签: '%s'，跳过后续操作", tab_text)
                 break
 
         # 获取渲染后的HTML
@@ -1669,87 +1764,372 @@ def get_html_content_Drission(name, url):
         return  rendered_html,xpathList4Click
         
     except Exception as e:
-        print(f"操作出错: {str(e)}")
+        logger.warning("操作出错: %s", e)
         
         return html,xpathList4Click
     
     finally:
         page.quit()
-        print("浏览器已关闭")
+        logger.debug("浏览器已关闭")
+
+# 分析引擎，按顺序尝试：先用内容容器评分，未得到有效XPath时换用列表容器定位
+ANALYSIS_ENGINES = ('content', 'list')
+ENGINE_LABELS = {'content': '内容容器', 'list': '列表容器'}
+
+def run_analysis_engine(html_content, engine, collect_features=False):
+    """用一个引擎分析一次页面，返回 (候选XPath, 是否验证通过, 说明, 候选容器特征)
+
+    分析对同一份HTML是确定性的，结果按 (内容哈希, 引擎, 是否收集特征) 缓存，同一页面不重复解析和评分
+    """
+    key = (content_digest(html_content), engine, collect_features)
+    outcome = analysis_memo.get(key)
+    if outcome is not None:
+        metrics.inc('cache_requests_total', {'cache': 'analysis', 'result': 'hit'})
+        return outcome
+    metrics.inc('cache_requests_total', {'cache': 'analysis', 'result': 'miss'})
+
+    tree = parse_html(html_content)
+    candidate_rows = [] if collect_features else None
+    if engine == 'list':
+        container = find_list_container(tree)
+    else:
+        cleaned_body = preprocess_html_remove_interference(tree)
+        container = find_main_content_in_cleaned_html(cleaned_body, candidate_rows)
+        cleaned_body = None
+
+    candidate_xpath = generate_xpath(container) if container else None
+    if not container:
+        outcome = (None, False, "未找到有效的内容容器", candidate_rows)
+    elif not candidate_xpath:
+        outcome = (None, False, "无法生成XPath", candidate_rows)
+    else:
+        # 在分析用的树上验证，不重新解析页面
+        valid, validation_result = validate_xpath(candidate_xpath, tree)
+        outcome = (candidate_xpath, valid, validation_result, candidate_rows)
 
-def process_entry(entry, max_retries=3):
-    """处理单个条目"""
-    url = entry['url']
-    name = entry['name']
-    xpathList4Click = ""
-    print(f"\n处理: {entry['name']}")
-    print(f"URL: {url}")
-    if name.endswith('js'):
-        print("JS页面")
-        html_content,xpathList4Click = get_html_content_Drission(name,url)
-    else :
-        print("非JS页面")
-        # 有100%可以获取的方法就不要换成可能出风险的方法，慢一点就慢一点，准确率最重要
-        html_content = get_html_content_Selenium(url)
+    analysis_memo.put(key, outcome)
+    return outcome
 
-    if not html_content:
-        print("\nHtml content获取失败")
-        return {**entry, 'xpath': None, 'status': 'failed'}
-        
+def analyze_html_content(html_content, max_retries=3, collect_features=False):
+    """对已获取的页面做完整分析：预处理 -> 容器评分 -> 生成XPath
+    
+    每次尝试换用下一个分析引擎（最多max_retries个），同一引擎重复分析同一页面只会得到相同结果；
+    都未验证通过时使用第一个生成的候选XPath。
+    返回 (最终XPath, 每次尝试的记录, 候选容器特征)；collect_features=False时候选容器特征为None
+    """
+    attempts = []
     best_xpath = None
-    validation_result = ""
-    candidate_xpath = None
-
-    for attempt in range(1, max_retries + 1):
-        print(f"\n尝试 #{attempt}")
-        
-        tree = html.fromstring(html_content)
-        
-        # 使用新的逻辑：直接获取分数最高的容器，不检测列表
-        cleaned_body = preprocess_html_remove_interference(tree)
-        best_container = find_main_content_in_cleaned_html(cleaned_body)
-        
-        if not best_container:
-            print("未找到有效的内容容器")
-            continue
-        
-        candidate_xpath = generate_xpath(best_container)
-        if not candidate_xpath:
-            print("无法生成XPath")
-            time.sleep(1)
-            continue
+    fallback_xpath = None
+    candidate_rows = None
 
-        print(f"XPath: {candidate_xpath}")
-        
-        # 新的验证逻辑：只验证XPath是否有效，不检测列表项数量
+    for attempt, engine in enumerate(ANALYSIS_ENGINES[:max(max_retries, 1)], 1):
+        logger.debug("尝试 #%d: %s", attempt, ENGINE_LABELS[engine])
         try:
-            results = tree.xpath(candidate_xpath)
-            if results:
-                best_xpath = candidate_xpath
-                validation_result = f"找到有效容器，标签: {results[0].tag}"
-                break
-            else:
-                validation_result = "XPath未找到元素"
+            candidate_xpath, valid, validation_result, rows = run_analysis_engine(html_content, engine,
+                                                                                  collect_features)
         except Exception as e:
-            validation_result = f"XPath执行错误: {str(e)}"
-        
-        print(f"验证结果: {validation_result}")
-        
-        if attempt == max_retries and not best_xpath:
-            # 最后一次尝试，使用最佳候选
+            # 一个引擎出错不影响后面的引擎，记为失败的尝试
+            logger.warning("%s分析出错: %s: %s", ENGINE_LABELS[engine], type(e).__name__, e)
+            candidate_xpath, valid, rows = None, False, None
+            validation_result = f"分析出错: {type(e).__name__}: {e}"
+        if attempt == 1:
+            candidate_rows = rows
+        else:
+            validation_result = f"{ENGINE_LABELS[engine]}: {validation_result}"
+        attempts.append({'attempt': attempt, 'xpath': candidate_xpath, 'validation': validation_result})
+        if valid:
+            logger.debug("XPath: %s", candidate_xpath)
             best_xpath = candidate_xpath
-            validation_result = f"最终选择: {validation_result}"
+            break
+        logger.info("验证结果: %s", validation_result)
+        fallback_xpath = fallback_xpath or candidate_xpath
+
+    if not best_xpath:
+        best_xpath = fallback_xpath
+
+    # 分析用的lxml树在引擎返回时已释放；内存紧张时马上回收
+    if memory_governor.under_pressure:
+        gc.collect()
+    return best_xpath, attempts, candidate_rows
+
+def analyze_html(html_content, url=None, collect_features=False):
+    """库接口：分析已获取的HTML，返回 {url, status, xpath, attempts, timings[, candidates][, error]}
+    
+    只做 预处理 -> 容器评分 -> 生成XPath，不启动浏览器、不访问网络、不写文件，
+    每次调用都在自己的lxml树上进行，可以在同一进程中反复调用。
+    空文档、无法解析的页面等不抛出异常，返回status为failed的结果：各分析引擎的错误记录在attempts中，
+    其他分析异常的信息放在error中。
+
+    """
+    start_time = time.time()
+    error = None
+    try:
+        # 每个分析引擎对同一份HTML只分析一次
+        best_xpath, attempts, candidate_rows = analyze_html_content(html_content, len(ANALYSIS_ENGINES),
+                                                                    collect_features)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        logger.warning("分析出错: %s - %s", url, error)
+        best_xpath, candidate_rows = None, None
+        attempts = [{'attempt': 1, 'xpath': None, 'validation': f"分析出错: {error}"}]
+    result = {
+        'url': url,
+        'status': 'success' if best_xpath else 'failed',
+        'xpath': best_xpath,
+        'attempts': attempts,
+        'timings': {'analysis': time.time() - start_time},
+    }
+    if collect_features:
+        result['candidates'] = candidate_rows or []
+    if error:
+        result['error'] = error
+    return result
+
+def process_entry(entry, max_retries=3, collect_features=False, prefetched=None, fingerprints=None):
+    """处理单个条目；collect_features=True时在结果中附带各候选容器的评分特征
+    
+    prefetched=(html_content, fetch_info)时直接分析已获取的页面，不再抓取；
+    fingerprints不为空时，页面结构指纹与上次相同且上次的XPath验证通过则直接复用，跳过评分
+    """
+    url = entry['url']
+    name = entry['name']
+    xpathList4Click = ""
+    fetch_info = {'tier': None, 'attempts': 1, 'error': None, 'error_kind': None}
+    timings = {}
+    attempts = []
+    start_time = time.time()
+    logger.info("处理: %s", entry['name'])
+    logger.info("URL: %s", url)
+    if prefetched is not None:
+        html_content, fetch_info = prefetched
+    else:
+        host = urlparse(url).netloc.lower()
+        host_limiter.acquire(host)
+        fetch_start = time.time()
+        try:
+            if name.endswith('js'):
+                logger.debug("JS页面")
+                fetch_info['tier'] = 'drission'
+                html_content,xpathList4Click = get_html_content_Drission(name,url)
+            else :
+                logger.debug("非JS页面")
+                # 有100%可以获取的方法就不要换成可能出风险的方法，慢一点就慢一点，准确率最重要
+                html_content = get_html_content_Selenium(url, fetch_info=fetch_info)
+        except Exception as e:
+            fetch_info['error_kind'] = classify_fetch_error(e)
+            raise
+        finally:
+            # 根据本次获取的延迟和错误类型调整该站点的并发上限
+            host_limiter.release(host, host_latency(fetch_info, fetch_start), fetch_info['error_kind'])
+    timings['fetch'] = time.time() - start_time
+
+    if not html_content:
+        logger.warning("Html content获取失败: %s", entry['name'])
+        timings['total'] = time.time() - start_time
+        return {**entry, 'xpath': None, 'status': 'failed',
+                'fetch': fetch_info, 'attempts': attempts, 'timings': timings}
+        
+    analysis_start = time.time()
+    fingerprint = None
+    if fingerprints is not None:
+        tree = parse_html(html_content)
+        fingerprint = structural_fingerprint(tree)
+        previous = fingerprints.lookup(fingerprint_key(entry))
+        if previous and previous['fingerprint'] == fingerprint:
+            valid, message = check_stored_xpath(tree, previous['xpath'])
+            tree = None
+            logger.info("结构指纹未变: %s", message)
+            if valid:
+                metrics.inc('cache_requests_total', {'cache': 'fingerprint', 'result': 'hit'})
+                timings['analysis'] = time.time() - analysis_start
+                timings['total'] = time.time() - start_time
+                logger.info("✓ 复用上次XPath: %s", previous['xpath'])
+                result = {**entry, 'xpath': previous['xpath'], 'status': 'success',
+                          'xpathList4Click': xpathList4Click or previous.get('xpathList4Click') or None,
+                          'fingerprint': fingerprint, 'fetch': fetch_info, 'timings': timings,
+                          'attempts': [{'attempt': 1, 'xpath': previous['xpath'], 'validation': f"结构指纹未变: {message}"}]}
+                if collect_features:
+                    result['candidates'] = []
+                return result
+        tree = None
+        metrics.inc('cache_requests_total', {'cache': 'fingerprint', 'result': 'miss'})
+    
+    best_xpath, attempts, candidate_rows = analyze_html_content(html_content, max_retries, collect_features)
+    fallback_seconds = 0.0
+    if not best_xpath and prefetched is None and not name.endswith('js'):
+        # 同一份页面再分析只会得到相同结果：重试改为用requests重新获取一次，
+        # 拿到的页面与之前相同时直接命中分析缓存
+        logger.info("未能找到XPath，改用requests重新获取页面")
+        host = urlparse(url).netloc.lower()
+        host_limiter.acquire(host)
+        fetch_start = time.time()
+        retry_info = {'error': None, 'error_kind': None}
+        try:
+            retry_content = get_html_content(url, retry_info)
+        finally:
+            host_limiter.release(host, host_latency(retry_info, fetch_start), retry_info['error_kind'])
+            fallback_seconds = time.time() - fetch_start
+        fetch_info['attempts'] += 1
+        if retry_content:
+            retry_xpath, retry_attempts, retry_rows = analyze_html_content(retry_content, max_retries, collect_features)
+            attempts = attempts + [{**attempt, 'attempt': len(attempts) + attempt['attempt'],
+                                    'validation': f"requests: {attempt['validation']}"} for attempt in retry_attempts]
+            if retry_xpath:
+                best_xpath, candidate_rows = retry_xpath, retry_rows
+                fetch_info['tier'] = 'requests'
+    timings['fetch'] += fallback_seconds
+    timings['analysis'] = time.time() - analysis_start - fallback_seconds
+    timings['total'] = time.time() - start_time
+
+    stats = {'fetch': fetch_info, 'attempts': attempts, 'timings': timings, 'fingerprint': fingerprint}
+    if collect_features:
+        stats['candidates'] = candidate_rows or []
 
     if best_xpath:
         if xpathList4Click:
-            print(f"✓ 最终XPath: {best_xpath} (点击列表: {xpathList4Click})")
-            return {**entry, 'xpath': best_xpath, 'status': 'success', 'xpathList4Click': xpathList4Click}
+            logger.info("✓ 最终XPath: %s (点击列表: %s)", best_xpath, xpathList4Click)
+            return {**entry, 'xpath': best_xpath, 'status': 'success', 'xpathList4Click': xpathList4Click, **stats}
         else :
-            print(f"✓ 最终XPath: {best_xpath}")
-            return {**entry, 'xpath': best_xpath, 'status': 'success', 'xpathList4Click': None}
+            logger.info("✓ 最终XPath: %s", best_xpath)
+            return {**entry, 'xpath': best_xpath, 'status': 'success', 'xpathList4Click': None, **stats}
     
-    print("✗ 未能找到有效XPath")
-    return {**entry, 'xpath': None, 'status': 'failed','xpathList4Click': None}
+    logger.info("✗ 未能找到有效XPath")
+    return {**entry, 'xpath': None, 'status': 'failed','xpathList4Click': None, **stats}
+
+# 复核已有XPath时，容器至少要有这么多文字、得分要高于这个值才算"有意义的内容容器"
+REVALIDATE_MIN_TEXT_LENGTH = 50
+REVALIDATE_MIN_SCORE = -50
+
+def stored_xpath_containers(tree, xpath):
+    return [result for result in tree.xpath(xpath) if isinstance(result, html.HtmlElement)]
+
+def check_stored_xpath(tree, xpath):
+    """检查已有XPath在新页面上是否仍然定位到有意义的内容容器，返回 (是否有效, 说明)
+    
+    和分析时一样在去除干扰后的页面上执行XPath并评分（XPath本来就是在清理后的页面上生成的），
+    清理后找不到元素时再到原始页面上执行；预处理在副本上进行，tree不被修改（调用方还要用它计算结构指纹）
+    """
+    cleaned_tree = copy.deepcopy(tree)
+    preprocess_html_remove_interference(cleaned_tree)
+    try:
+        containers = stored_xpath_containers(cleaned_tree, xpath) or stored_xpath_containers(tree, xpath)
+    except Exception as e:
+        return False, f"XPath执行错误: {str(e)}"
+    
+    if not containers:
+        return False, "未找到元素"
+    
+    container = containers[0]
+    text_length = len(container.text_content().strip())
+    if text_length < REVALIDATE_MIN_TEXT_LENGTH:
+        return False, f"容器内容太少: {text_length}字, 标签: {container.tag}"
+    
+    score = calculate_content_container_score(container)
+    if score <= REVALIDATE_MIN_SCORE:
+        return False, f"容器得分过低: {score}, 标签: {container.tag}"
+    return True, f"已有XPath仍有效，标签: {container.tag}, 得分: {score}"
+
+def replay_clicks_Drission(url, xpathList4Click):
+    """按已保存的点击XPath列表重放点击，返回渲染后的HTML；任一步找不到元素时返回None"""
+    from DrissionPage import ChromiumPage
+    page = ChromiumPage()
+    try:
+        page.get(url)
+        for i, click_xpath in enumerate(xpathList4Click):
+            element = page.ele(f'xpath:{click_xpath}', timeout=5)
+            if not element:
+                logger.warning("⚠️ 重放点击时未找到元素: %s", click_xpath)
+                return None
+            element.click(by_js=True)
+            logger.info("已重放点击(%d/%d): %s", i + 1, len(xpathList4Click), click_xpath)
+            page.wait.load_start()
+            page.wait(3)
+        return page.html
+    except Exception as e:
+        logger.warning("重放点击出错: %s", e)
+        return None
+    finally:
+        page.quit()
+
+def revalidate_entry(entry, collect_features=False, fingerprints=None):
+    """复核已有结果：按成本从低到高获取页面（requests -> Selenium；JS页面重放已保存的点击），
+    检查已有XPath是否仍定位到有意义的内容容器，只有失效的条目才重新做完整分析"""
+    url = entry['url']
+    name = entry['name']
+    stored_xpath = entry.get('xpath')
+    click_list = entry.get('xpathList4Click') or []
+    if not stored_xpath:
+        logger.info("复核: %s 没有已有XPath，完整分析", name)
+        metrics.inc('revalidations_total', {'result': 'reanalyzed'})
+        return process_entry(entry, collect_features=collect_features, fingerprints=fingerprints)
+    
+    logger.info("复核: %s", name)
+    logger.info("URL: %s", url)
+    logger.info("已有XPath: %s", stored_xpath)
+    fetch_info = {'tier': None, 'attempts': 0, 'error': None, 'error_kind': None}
+    attempts = []
+    start_time = time.time()
+    fetch_seconds = 0.0
+    
+    if name.endswith('js'):
+        # 按name重新查找标签要逐个尝试多种策略，重放已保存的点击XPath更快
+        tiers = [('drission_replay', lambda: replay_clicks_Drission(url, click_list))] if click_list else []
+    else:
+        tiers = [('requests', lambda: get_html_content(url, fetch_info)),
+                 ('selenium', lambda: get_html_content_Selenium(url, fetch_info=fetch_info))]
+    
+    host = urlparse(url).netloc.lower()
+    html_content = None
+    for tier, fetch in tiers:
+        fetch_info['error_kind'] = None
+        host_limiter.acquire(host)
+        fetch_start = time.time()
+        try:
+            html_content = fetch()
+        except Exception as e:
+            fetch_info['error'] = str(e)
+            fetch_info['error_kind'] = classify_fetch_error(e)
+            html_content = None
+        finally:
+            host_limiter.release(host, host_latency(fetch_info, fetch_start), fetch_info['error_kind'])
+            fetch_seconds += time.time() - fetch_start
+        fetch_info['tier'] = tier
+        fetch_info['attempts'] += 1
+        if not html_content:
+            attempts.append({'attempt': len(attempts) + 1, 'xpath': stored_xpath, 'validation': f"{tier}: 页面获取失败"})
+            continue
+        
+        tree = parse_html(html_content)
+        valid, message = check_stored_xpath(tree, stored_xpath)
+        logger.info("%s: %s", tier, message)
+        attempts.append({'attempt': len(attempts) + 1, 'xpath': stored_xpath, 'validation': f"{tier}: {message}"})
+        if valid:
+            metrics.inc('revalidations_total', {'result': 'kept'})
+            total = time.time() - start_time
+            result = {**entry, 'xpath': stored_xpath, 'status': 'success', 'xpathList4Click': click_list or None,
+                      'fingerprint': structural_fingerprint(tree) if fingerprints is not None else None,
+                      'fetch': fetch_info, 'attempts': attempts,
+                      'timings': {'fetch': fetch_seconds, 'analysis': total - fetch_seconds, 'total': total}}
+            if collect_features:
+                result['candidates'] = []
+            return result
+    
+    # 已有XPath失效：重新做完整分析；静态页面直接分析最后一次获取到的页面，不再重复抓取
+    logger.info("已有XPath失效，重新分析")
+    metrics.inc('revalidations_total', {'result': 'reanalyzed'})
+    tree = None
+    if name.endswith('js') or not html_content:
+        result = process_entry(entry, collect_features=collect_features, fingerprints=fingerprints)
+    else:
+        result = process_entry(entry, collect_features=collect_features, prefetched=(html_content, fetch_info),
+                               fingerprints=fingerprints)
+    result['attempts'] = attempts + [{**attempt, 'attempt': len(attempts) + attempt['attempt']}
+                                     for attempt in result.get('attempts') or []]
+    timings = result.get('timings') or {}
+    timings['fetch'] = timings.get('fetch', 0.0) + fetch_seconds
+    timings['total'] = time.time() - start_time
+    result['timings'] = timings
+    return result
 
 def parse_input_file(input_file):
     """解析输入文件"""
@@ -1768,85 +2148,429 @@ def parse_input_file(input_file):
     
     return entries
 
-def write_output_file(results, output_file):
-    """写入输出文件"""
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for result in results:
-            output_data = {
-                'name': result['name'],
-                'url': result['url'],
-                'xpath': result.get('xpath', '')  
-            }
-            if result.get('xpathList4Click'):
-                output_data['xpathList4Click'] = result['xpathList4Click']
-            f.write("---\n")  
-            f.write(f"name: {output_data['name']}\n")
-            f.write(f"url: {output_data['url']}\n")
-            f.write(f"xpath: \"{output_data['xpath']}\"\n")
-            if 'xpathList4Click' in output_data and output_data['xpathList4Click']:
-                f.write("xpathList4Click:\n")
-                for xpath in output_data['xpathList4Click']:
-                    safe_xpath = xpath.replace('"', '\\"').replace('\n', '\\n')
-                    f.write(f"  - \"{safe_xpath}\"\n")
-            else:
-                f.write("xpathList4Click: []\n")
-            
+# 通道优先级：静态页面成本低，先调度；JS页面需要新开浏览器并点击标签，排在后面
+LANE_PRIORITY = ['static', 'js']
+
+def entry_lane(entry):
+    """name以js结尾的条目走DrissionPage点击流程，其余走Selenium"""
+    return 'js' if entry['name'].endswith('js') else 'static'
+
+def record_entry_metrics(result):
+    """记录单个条目的结果、各阶段耗时和失败类型"""
+    status = result.get('status') or 'failed'
+    fetch_info = result.get('fetch') or {}
+    timings = result.get('timings') or {}
+    metrics.inc('entries_total', {'status': status})
+    if 'fetch' in timings:
+        metrics.observe('stage_seconds', timings['fetch'], {'stage': 'fetch', 'tier': fetch_info.get('tier') or 'none'})
+    if 'analysis' in timings:
+        metrics.observe('stage_seconds', timings['analysis'], {'stage': 'analysis'})
+    if status != 'success':
+        if not timings:
+            failure_class = 'exception'
+        elif 'analysis' not in timings:
+            failure_class = fetch_info.get('error_kind') or 'no_content'
+        else:
+            failure_class = 'no_xpath'
+        metrics.inc('failures_total', {'class': failure_class})
 
-def process_entries_parallel(entries, max_workers=1):
-    """并行处理多个条目"""
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        results = list(executor.map(process_entry, entries))
+def reserve_host(entry):
+    """调度器派发条目前调用：该站点并发已满时返回False，条目留在队列中，工作线程先处理其他站点的条目，
+    不会占着通道额度在acquire里等待；已附带HTML的条目不访问站点，直接放行"""
+    if entry.get('html'):
+        return True
+    return host_limiter.try_acquire(urlparse(entry['url']).netloc.lower())
+
+def create_entry_scheduler(max_workers=1, js_workers=1):
+    """条目调度器：静态页面和JS页面两个通道，派发时检查站点并发，需要attach_scheduler接入额度通知和指标
+
+    只有静态通道可以借用空闲额度：DrissionPage的ChromiumPage()都连到同一个浏览器，
+    一个条目的page.quit()会关掉另一个条目的标签页，JS通道严格不超过js_workers
+    """
+    return LaneScheduler({'static': max_workers, 'js': js_workers}, priority=LANE_PRIORITY, borrowable={'static'},
+                         admit=reserve_host, finish=lambda entry: host_limiter.cancel_reservation(),
+                         throttled_limits={'js': 0})
+
+
+def attach_scheduler(scheduler):
+    """站点额度归还时唤醒调度器，并注册各通道的队列深度和运行数指标（同一时间只接入一个调度器）
+
+    超过内存软水位时JS通道暂停派发新条目：每个JS条目都会打开DrissionPage浏览器标签，不受WebDriver池收缩的约束；
+    调度器完全空闲时仍放行一个，内存回落后恢复
+    """
+    host_limiter.on_release(scheduler.wake)
+    memory_governor.on_pressure(scheduler.throttle)
+    memory_governor.on_recovery(scheduler.unthrottle)
+    if memory_governor.under_pressure:
+        scheduler.throttle()
+    metrics.register_gauge('queue_depth', lambda: {(('lane', lane),): depth for lane, depth in scheduler.queue_depths().items()},
+                           "各通道待调度的条目数")
+    metrics.register_gauge('lane_running', lambda: {(('lane', lane),): count for lane, count in scheduler.running_counts().items()},
+                           "各通道正在处理的条目数")
+
+def detach_scheduler(scheduler):
+    host_limiter.remove_release_callback(scheduler.wake)
+    memory_governor.remove_callback(scheduler.throttle)
+    memory_governor.remove_callback(scheduler.unthrottle)
+    metrics.unregister_gauge('queue_depth')
+    metrics.unregister_gauge('lane_running')
+
+def process_entries_parallel(entries, max_workers=1, on_result=None, worker=process_entry, js_workers=1,
+                             scheduler=None):
+    """分通道并行处理多个条目，每完成一个条目立即回调 on_result(index, result)
+    
+    静态页面和JS页面各自有并发上限（max_workers / js_workers），静态页面优先，
+    某个通道没有任务时其空闲额度可借给另一个通道。
+    scheduler不为空时提交到这个已接入的常驻调度器（常驻服务的所有请求共用并发上限），忽略max_workers/js_workers。
+    """
+    results = [None] * len(entries)
+    owned = scheduler is None
+    if owned:
+        scheduler = create_entry_scheduler(max_workers, js_workers)
+        attach_scheduler(scheduler)
+    
+    def on_error(index, error):
+        logger.error("处理条目出错: %s - %s", entries[index]['name'], error)
+        return {**entries[index], 'xpath': None, 'status': 'failed', 'xpathList4Click': None}
+    
+    def collect(index, result):
+        results[index] = result
+        record_entry_metrics(result)
+        if on_result:
+            on_result(index, result)
+    
+    def governed_worker(entry):
+        # 超过内存软水位时在这里暂停，直到内存回落
+        memory_governor.admit(entry['name'])
+        try:
+            # 配置了--trace-dir时，该条目处理期间的日志同时写入它自己的跟踪文件
+            with trace_entry(entry):
+                return worker(entry)
+        finally:
+            memory_governor.release(entry['name'])
+    
+    jobs = [(entry_lane(entry), index, entry) for index, entry in enumerate(entries)]
+    try:
+        # Ctrl-C时调度器停止派发本次的新条目，已完成的结果已经写入输出文件
+        scheduler.run(jobs, governed_worker, collect, on_error=on_error)
+    finally:
+        if owned:
+            detach_scheduler(scheduler)
+    if owned:
+        for line in scheduler.summary():
+            logger.info(line)
     return results
 
-def process_yml_file(input_file, output_file):
-    """处理YML文件"""
-    entries = parse_input_file(input_file)
-    total = len(entries)
+def open_file_job(input_file, output_file, restore_order=True, resume=False, revalidate=False):
+    """为一个输入文件准备写入器、断点文件和待处理条目；resume=True时跳过已成功的条目，
+    revalidate=True时输入文件是已有的输出文件，条目带着已有的XPath"""
+    entries = parse_output_file(input_file) if revalidate else parse_input_file(input_file)
+    if not entries:
+        logger.warning("未找到有效条目: %s", input_file)
+        return None
     
-    if total == 0:
-        print("未找到有效条目")
-        return
+    # 断点续跑：从部分输出或断点文件中找出已成功的条目，只重跑失败和缺失的条目
+    completed = load_completed_results(output_file) if resume else {}
+    skipped = {index: {**entry, **completed[entry_key(entry)]}
+               for index, entry in enumerate(entries) if entry_key(entry) in completed}
+    pending = [(index, entry) for index, entry in enumerate(entries) if index not in skipped]
+    logger.info("%s: 找到 %d 个待处理条目", input_file, len(entries))
+    if resume:
+        logger.info("断点续跑: 跳过 %d 个已成功条目，剩余 %d 个", len(skipped), len(pending))
+    
+    # 续跑时以追加方式打开，保证重启过程中再次崩溃也不会丢失已有结果
+    writer = IncrementalResultWriter(output_file, restore_order=restore_order, append=resume)
+    checkpoint = CheckpointLog(checkpoint_path(output_file), append=resume)
+    for index, result in skipped.items():
+        writer.add_existing(result, index)
+    
+    return {
+        'input_file': input_file,
+        'output_file': output_file,
+        'total': len(entries),
+        'skipped': len(skipped),
+        'pending': pending,
+        'remaining': len(pending),
+        'success': len(skipped),
+        'writer': writer,
+        'checkpoint': checkpoint,
+    }
+
+def close_file_job(job, completed=True):
+    """关闭一个文件的写入器和断点文件，并输出该文件的统计"""
+    job['checkpoint'].close()
+    job['writer'].close(completed=completed)
+    if completed:
+        failure_count = job['total'] - job['success']
+        logger.info("%s 处理完成: %d 成功, %d 失败, %d 跳过", job['input_file'], job['success'], failure_count,
+                    job['skipped'])
+        logger.info("结果已保存至: %s", job['output_file'])
+
+def interleave_file_jobs(jobs):
+    """按文件轮询交错排列所有待处理条目，避免一个大文件拖住其他文件"""
+    queue = []
+    longest = max((len(job['pending']) for job in jobs), default=0)
+    for position in range(longest):
+        for job in jobs:
+            if position < len(job['pending']):
+                index, entry = job['pending'][position]
+                queue.append((job, index, entry))
+    return queue
+
+# 去重时忽略的跟踪类查询参数
+TRACKING_QUERY_PARAMS = {'spm', 'from', 'fbclid', 'gclid', 'share', 'share_token', '_'}
+# 去重时视为目录首页的文件名
+INDEX_PAGE_NAMES = ('index.html', 'index.htm', 'index.shtml')
+
+def normalize_url(url):
+    """规范化URL用于去重：忽略http/https差异、末尾的index.html和跟踪参数"""
+    parsed = urlparse(url.strip())
+    netloc = parsed.netloc.lower()
+    if netloc.endswith(':80') or netloc.endswith(':443'):
+        netloc = netloc.rsplit(':', 1)[0]
+    
+    path = parsed.path or '/'
+    for index_name in INDEX_PAGE_NAMES:
+        if path.lower().endswith('/' + index_name):
+            path = path[:-len(index_name)]
+            break
     
-    print(f"找到 {total} 个待处理条目")
+    query = [(key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+             if key.lower() not in TRACKING_QUERY_PARAMS and not key.lower().startswith('utm_')]
+    query.sort()
     
-    # 使用并行处理
-    results = process_entries_parallel(entries)
+    # 保留fragment：JS页面常用#iframe等锚点区分内容
+    return urlunparse(('', netloc, path, parsed.params, urlencode(query), parsed.fragment))
+
+def job_key(entry):
+    """相同(通道, 规范化URL, 点击路径)的条目抓取和分析结果完全相同
+
+    通道必须在键中：name只是"js"的JS条目点击路径为空，与同一URL的静态条目获取方式不同，不能合并
+    """
+    name = entry['name']
+    lane = entry_lane(entry)
+    click_path = tuple(process_name(name)) if lane == 'js' else ()
+    return (lane, normalize_url(entry['url']), click_path)
+
+def fingerprint_key(entry):
+    """结构指纹索引的键：规范化URL加点击路径，JS条目另加通道标记"""
+    lane, url, click_path = job_key(entry)
+    key = ' > '.join((url,) + click_path)
+    return key if lane == 'static' else f"[{lane}] {key}"
+
+
+def plan_unique_jobs(entries):
+    """对条目去重，返回唯一任务列表和 任务序号 -> 原始条目序号列表 的映射"""
+    unique_entries = []
+    fan_out = []
+    key_to_job = {}
+    for index, entry in enumerate(entries):
+        key = job_key(entry)
+        if key not in key_to_job:
+            key_to_job[key] = len(unique_entries)
+            unique_entries.append(entry)
+            fan_out.append([])
+        fan_out[key_to_job[key]].append(index)
+    return unique_entries, fan_out
+
+def process_yml_files(file_pairs, max_workers=1, restore_order=True, resume=False, store=None, exporter=None,
+                      js_workers=1, revalidate=False, fingerprints=None):
+    """全局批处理：所有输入文件的条目共用一个线程池、一个WebDriver池和缓存，跨文件调度；
+    store不为空时同时把结果批量写入SQLite结果库，exporter不为空时导出结果和候选容器特征；
+    revalidate=True时输入为已有的输出文件，只复核已有XPath，失效的条目才重新分析；
+    fingerprints不为空时记录每个页面的结构指纹，结构未变的页面复用上次的XPath"""
+    jobs = []
+    for input_file, output_file in file_pairs:
+        job = open_file_job(input_file, output_file, restore_order=restore_order, resume=resume,
+                            revalidate=revalidate)
+        if job is not None:
+            jobs.append(job)
+    
+    if not jobs:
+        logger.warning("未找到有效条目")
+        return
     
-    # 写入结果
-    write_output_file(results, output_file)
+    queue = interleave_file_jobs(jobs)
+    logger.info("共 %d 个文件, %d 个待处理条目", len(jobs), len(queue))
+    size_driver_pool(max_workers)
+
+    
+    # 没有待处理条目的文件（续跑时全部已成功）直接收尾
+    for job in jobs:
+        if job['remaining'] == 0:
+            close_file_job(job)
+    
+    # 相同URL（含不同文件、不同name面包屑）只抓取和分析一次，结果复制给每个来源条目
+    unique_entries, fan_out = plan_unique_jobs([entry for _, _, entry in queue])
+    saved = len(queue) - len(unique_entries)
+    metrics.inc('cache_requests_total', {'cache': 'dedup', 'result': 'hit'}, saved)
+    metrics.inc('cache_requests_total', {'cache': 'dedup', 'result': 'miss'}, len(unique_entries))
+    metrics.register_gauge('entries_planned', lambda: len(unique_entries), "本次运行需要处理的任务数")
+    if saved:
+        logger.info("去重: %d 个条目合并为 %d 个任务，节省 %d 次抓取和分析", len(queue), len(unique_entries), saved)
+    
+    def on_result(unique_index, shared_result):
+        write_start = time.time()
+        candidates = shared_result.pop('candidates', None)
+        if exporter is not None:
+            exporter.add_candidates(unique_index, shared_result['url'], candidates)
+        if fingerprints is not None:
+            fingerprints.update(fingerprint_key(unique_entries[unique_index]), shared_result)
+        for queue_index in fan_out[unique_index]:
+            job, index, entry = queue[queue_index]
+            result = {**shared_result, 'name': entry['name'], 'url': entry['url']}
+            if exporter is not None:
+                exporter.add_entry(result, unique_index, job['input_file'], index, len(candidates or []))
+            job['writer'].write(result, index)
+            job['checkpoint'].record(result)
+            if store is not None:
+                store.add_result(result, job['input_file'], index)
+            if result.get('status') == 'success':
+                job['success'] += 1
+            job['remaining'] -= 1
+            # 某个文件的条目全部完成后立即收尾，不等待其他文件
+            if job['remaining'] == 0:
+                close_file_job(job)
+        metrics.observe('stage_seconds', time.time() - write_start, {'stage': 'write'})
+    
+    if store is not None:
+        run_id = store.start_run(", ".join(job['input_file'] for job in jobs))
+        logger.info("结果库批次: %s (%s)", run_id, store.db_path)
+    
+    completed_run = False
+    try:
+        worker = partial(revalidate_entry if revalidate else process_entry, collect_features=exporter is not None,
+                         fingerprints=fingerprints)
+        process_entries_parallel(unique_entries, max_workers=max_workers, on_result=on_result, worker=worker,
+                                 js_workers=js_workers)
+        completed_run = True
+    finally:
+        for job in jobs:
+            if job['remaining'] > 0:
+                close_file_job(job, completed=completed_run)
+        if store is not None:
+            store.finish_run()
     
     # 生成统计报告
-    success_count = sum(1 for r in results if r.get('status') == 'success')
-    failure_count = total - success_count
-    
-    print(f"\n处理完成: {success_count} 成功, {failure_count} 失败")
-    print(f"结果已保存至: {output_file}")
+    total = sum(job['total'] for job in jobs)
+    success_count = sum(job['success'] for job in jobs)
+    skipped_count = sum(job['skipped'] for job in jobs)
+    logger.info("全部处理完成: %d 成功, %d 失败, %d 跳过, 去重节省 %d 个任务", success_count, total - success_count,
+                skipped_count, saved)
+    if revalidate:
+        revalidations = metrics.counter_by_label('revalidations_total', 'result')
+        logger.info("复核: 已有XPath仍有效 %d 个, 重新分析 %d 个", revalidations.get('kept', 0),
+                    revalidations.get('reanalyzed', 0))
+    for line in host_limiter.summary() + memory_governor.summary():
+        logger.info(line)
+
+def process_yml_file(input_file, output_file, restore_order=True, resume=False, max_workers=1, store=None,
+                     exporter=None, js_workers=1, fingerprints=None):
+    """处理YML文件，结果边处理边写入输出文件；resume=True时跳过已成功的条目"""
+    process_yml_files([(input_file, output_file)], max_workers=max_workers, restore_order=restore_order,
+                      resume=resume, store=store, exporter=exporter, js_workers=js_workers, fingerprints=fingerprints)
+
+def process_yml_folder(input_folder, output_folder, max_workers=1, restore_order=True, resume=False, store=None,
+                       exporter=None, js_workers=1, fingerprints=None):
+    """文件夹模式：处理input_folder下所有yml文件，每个输入文件在output_folder下输出一个同名文件"""
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+    
+    files = sorted(glob.glob(os.path.join(input_folder, "*.yml")))
+    file_pairs = [(input_file, os.path.join(output_folder, os.path.basename(input_file)))
+                  for input_file in files]
+    process_yml_files(file_pairs, max_workers=max_workers, restore_order=restore_order, resume=resume, store=store,
+                      exporter=exporter, js_workers=js_workers, fingerprints=fingerprints)
+
+def revalidate_output(path, max_workers=1, store=None, exporter=None, js_workers=1, fingerprints=None):
+    """复核模式：path为已有的输出文件或输出目录（如 testout.yml / processed），原地更新结果，
+    原文件先备份为 .bak"""
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, "*.yml")))
+    else:
+        files = [path]
+    for output_file in files:
+        shutil.copyfile(output_file, output_file + '.bak')
+    process_yml_files([(output_file, output_file) for output_file in files], max_workers=max_workers, store=store,
+                      exporter=exporter, js_workers=js_workers, revalidate=True, fingerprints=fingerprints)
 
 
 import os
 import glob
+import shutil
+import argparse
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="基于内容容器定位的XPath生成工具")
+    parser.add_argument("--html", metavar="FILE", help="离线模式：直接分析本地HTML文件并输出XPath，不启动浏览器")
+    parser.add_argument("--input", default="test.yml", help="输入文件路径")
+    parser.add_argument("--output", default="testout.yml", help="输出文件路径")
+    parser.add_argument("--input-folder", help="文件夹模式：处理该目录下所有yml文件（如 waitprocess）")
+    parser.add_argument("--output-folder", default="processed", help="文件夹模式的输出目录")
+    parser.add_argument("--workers", type=int, default=1, help="静态页面通道（Selenium）的并发数")
+    parser.add_argument("--js-workers", type=int, default=1, help="JS页面通道（DrissionPage点击）的并发数")
+    parser.add_argument("--resume", action="store_true", help="断点续跑：跳过输出文件/断点文件中已成功的条目")
+    parser.add_argument("--revalidate", metavar="PATH",
+                        help="复核模式：检查已有输出文件/目录中的XPath是否仍有效，只重新分析失效的条目（原地更新，原文件备份为.bak）")
+    parser.add_argument("--db", help="SQLite结果库路径，记录条目、尝试、获取方式、耗时和XPath")
+    parser.add_argument("--export-run", type=int, help="从--db导出指定批次（0表示最新批次）到--output，不做处理")
+    parser.add_argument("--export-input", help="导出时只导出该输入文件的条目")
+    parser.add_argument("--metrics-port", type=int, help="在本地端口上以Prometheus文本格式暴露运行指标（/metrics）")
+    parser.add_argument("--progress-interval", type=float, default=60, help="每隔多少秒输出一行进度摘要，0表示关闭")
+    parser.add_argument("--memory-soft-mb", type=int,
+                        help="内存软水位(MB，含Chrome子进程)：超过后暂停接收新条目、收缩浏览器池并强制回收")
+    parser.add_argument("--fingerprints", metavar="FILE",
+                        help="页面结构指纹索引（JSON）：结构与上次相同的页面验证后直接复用上次的XPath，跳过评分")
+    parser.add_argument("--export-features", metavar="PREFIX",
+                        help="导出每个条目的结果和每个候选容器的评分特征（PREFIX.entries/.candidates 的jsonl和parquet）")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("-v", "--verbose", action="store_true", help="输出容器评分明细和清理后的HTML等调试信息")
+    verbosity.add_argument("-q", "--quiet", action="store_true", help="只输出警告和错误")
+    parser.add_argument("--trace-dir", metavar="DIR", help="每个条目的完整调试日志另外写入该目录下的单独文件")
+    args = parser.parse_args()
+    if args.revalidate and args.resume:
+        parser.error("--revalidate 不能与 --resume 同时使用")
+    if args.export_run is not None and not args.db:
+        parser.error("--export-run 需要同时指定 --db")
+
+    configure_logging(logging.DEBUG if args.verbose else logging.WARNING if args.quiet else logging.INFO,
+                      trace_dir=args.trace_dir)
+
+    memory_governor.set_soft_limit(args.memory_soft_mb)
+    store = ResultStore(args.db) if args.db else None
+    exporter = FeatureExporter(args.export_features) if args.export_features else None
+    fingerprints = FingerprintIndex(args.fingerprints) if args.fingerprints else None
+    if args.metrics_port:
+        start_metrics_server(metrics, args.metrics_port)
+        logger.info("运行指标: http://127.0.0.1:%d/metrics", args.metrics_port)
+    progress = ProgressReporter(metrics, args.progress_interval).start() if args.progress_interval > 0 else None
     try:
-        
-        input_file = "test.yml"    # 输入文件路径
-        output_file = "testout.yml"  # 输出文件路径
-        
-        process_yml_file(input_file, output_file)
-
-
-        # input_folder = "waitprocess"
-        # output_folder = "processed"  
-        
-        # if not os.path.exists(output_folder):
-        #     os.makedirs(output_folder)
-        
-        # files = glob.glob(os.path.join(input_folder, "*.yml"))
-        
-        # for input_file in files:
-        #     base_name = os.path.basename(input_file)  
-        #     output_file = os.path.join(output_folder, base_name)
-        #     process_yml_file(input_file, output_file)
+        if args.html:
+            with open(args.html, 'rb') as f:
+                result = analyze_html(f.read(), url=args.html)
+            mark = '✓' if result['status'] == 'success' else '✗'
+            print(f"{mark} 最终XPath: {result['xpath']} (分析耗时 {result['timings']['analysis']:.2f}s)")
+        elif store is not None and args.export_run is not None:
+            count = store.export_yaml(args.output, run_id=args.export_run or None, input_file=args.export_input)
+            logger.info("已导出 %d 个条目至: %s", count, args.output)
+        elif args.revalidate:
+            revalidate_output(args.revalidate, max_workers=args.workers, store=store, exporter=exporter,
+                              js_workers=args.js_workers, fingerprints=fingerprints)
+        elif args.input_folder:
+            process_yml_folder(args.input_folder, args.output_folder, max_workers=args.workers,
+                               resume=args.resume, store=store, exporter=exporter, js_workers=args.js_workers,
+                               fingerprints=fingerprints)
+        else:
+            process_yml_file(args.input, args.output, resume=args.resume, max_workers=args.workers, store=store,
+                             exporter=exporter, js_workers=args.js_workers, fingerprints=fingerprints)
     finally:
+        if store is not None:
+            store.close()
+        if exporter is not None:
+            exporter.close()
+        if fingerprints is not None:
+            fingerprints.close()
+        if progress is not None:
+            progress.stop()
         driver_pool.close_all()
 
 
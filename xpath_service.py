@@ -0,0 +1,235 @@
+import json
+import logging
+import os
+
+import time
+import argparse
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from threading import Lock
+
+from xpathFake import (attach_scheduler, create_entry_scheduler, detach_scheduler, driver_pool, fingerprint_key,
+                       job_key, metrics, process_entries_parallel, process_entry, size_driver_pool)
+from page_fingerprint import FingerprintIndex
+from diagnostics import configure_logging, logger
+
+
+# 返回给调用方的结果字段
+RESULT_FIELDS = ('name', 'url', 'status', 'xpath', 'xpathList4Click', 'fingerprint', 'fetch', 'attempts', 'timings')
+
+
+class ResultCache:
+    """按任务键(规范化URL, 点击路径)缓存成功结果，超过ttl秒或超过容量时淘汰最旧的"""
+
+    def __init__(self, ttl=300, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        if self.ttl <= 0:
+            return None
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            stored_at, result = item
+            if time.time() - stored_at > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return result
+
+    def put(self, key, result):
+        if self.ttl <= 0 or result.get('status') != 'success':
+            return
+        with self.lock:
+            self.entries[key] = (time.time(), result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class XPathService:
+    """常驻服务：浏览器池、站点限速、结构指纹和结果缓存在多次请求之间保持热状态"""
+
+    def __init__(self, max_workers=1, js_workers=1, cache_ttl=300, fingerprints=None):
+        self.max_workers = max_workers
+        self.js_workers = js_workers
+        self.cache = ResultCache(cache_ttl)
+        self.fingerprints = fingerprints
+        # 所有请求共用一个常驻调度器：--workers/--js-workers是整个服务的并发上限，不是每个请求的
+        size_driver_pool(max_workers)
+        self.scheduler = create_entry_scheduler(max_workers, js_workers)
+
+        attach_scheduler(self.scheduler)
+        self.scheduler.start()
+
+    def close(self):
+        self.scheduler.stop()
+        detach_scheduler(self.scheduler)
+
+    def _worker(self, entry):
+        html_content = entry.get('html')
+        entry = {'name': entry['name'], 'url': entry['url']}
+        if html_content:
+            # 调用方已经拿到了HTML，直接分析，不经过浏览器，也不使用按URL的结果缓存
+            fetch_info = {'tier': 'inline', 'attempts': 0, 'error': None, 'error_kind': None}
+            result = process_entry(entry, prefetched=(html_content, fetch_info), fingerprints=self.fingerprints)
+        else:
+            key = job_key(entry)
+            cached = self.cache.get(key)
+            if cached is not None:
+                metrics.inc('cache_requests_total', {'cache': 'service', 'result': 'hit'})
+                return {**cached, 'name': entry['name'], 'url': entry['url'], 'cached': True}
+            metrics.inc('cache_requests_total', {'cache': 'service', 'result': 'miss'})
+            result = process_entry(entry, fingerprints=self.fingerprints)
+            self.cache.put(key, result)
+        if self.fingerprints is not None:
+            self.fingerprints.update(fingerprint_key(entry), result)
+        return result
+
+    def analyze(self, entries, on_result):
+        """处理一批条目，每完成一个立即回调 on_result(序号, 结果)；条目为 {name, url[, html]}"""
+        def emit(index, result):
+            response = {field: result.get(field) for field in RESULT_FIELDS}
+            response['index'] = index
+            response['cached'] = bool(result.get('cached'))
+            on_result(index, response)
+
+        process_entries_parallel(entries, on_result=emit, worker=self._worker, scheduler=self.scheduler)
+
+
+def parse_entries(body):
+    """请求体可以是单个对象、对象列表、{"entries": [...]}，或每行一个JSON对象（NDJSON）"""
+    text = body.decode('utf-8')
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        data = data.get('entries', [data])
+
+    entries = []
+    for item in data:
+        if not isinstance(item, dict) or not item.get('url'):
+            raise ValueError(f"条目缺少url: {item}")
+        entries.append({'name': item.get('name', ''), 'url': item['url'], 'html': item.get('html')})
+    return entries
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    service = None
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/health':
+            self._send_json(200, {'status': 'ok', 'browser_pool_size': driver_pool.pool_size,
+                                  'browser_pool_in_use': driver_pool.in_use()})
+        elif path == '/metrics':
+            body = metrics.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {'error': f"未知路径: {path}"})
+
+    def do_POST(self):
+        path = self.path.split('?')[0]
+        if path not in ('/analyze', '/batch'):
+            self._send_json(404, {'error': f"未知路径: {path}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            entries = parse_entries(self.rfile.read(length))
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        if path == '/analyze':
+            # 单个条目：处理完后一次性返回
+            if len(entries) != 1:
+                self._send_json(400, {'error': "/analyze 只接受一个条目，批量请使用 /batch"})
+                return
+            results = []
+            self.service.analyze(entries, lambda index, result: results.append(result))
+            self._send_json(200, results[0])
+            return
+
+        # 批量：分块传输，每完成一个条目立即输出一行JSON（NDJSON），顺序为完成顺序
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def stream(index, result):
+            line = (json.dumps(result, ensure_ascii=False) + '\n').encode('utf-8')
+            self.wfile.write(f"{len(line):x}\r\n".encode('ascii') + line + b"\r\n")
+            self.wfile.flush()
+
+        self.service.analyze(entries, stream)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+def start_service(service, port=None, host='127.0.0.1', unix_socket=None):
+    """启动HTTP服务（TCP端口或Unix socket），返回server，调用方负责serve_forever"""
+    handler = type('ServiceHandler', (_ServiceHandler,), {'service': service})
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        return ThreadingUnixHTTPServer(unix_socket, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="XPath生成常驻服务：POST /analyze 单个条目，POST /batch 批量（NDJSON流式返回）")
+    parser.add_argument("--port", type=int, default=8765, help="监听的本地端口")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--unix-socket", help="改为监听Unix socket路径")
+    parser.add_argument("--workers", type=int, default=1, help="整个服务静态页面通道的并发数（所有请求共用）")
+    parser.add_argument("--js-workers", type=int, default=1, help="整个服务JS页面通道的并发数（所有请求共用）")
+    parser.add_argument("--cache-ttl", type=float, default=300, help="成功结果的缓存秒数，0表示不缓存")
+    parser.add_argument("--fingerprints", metavar="FILE", help="页面结构指纹索引（JSON），结构未变的页面复用上次的XPath")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出容器评分明细等调试信息")
+    parser.add_argument("--trace-dir", metavar="DIR", help="每个条目的完整调试日志另外写入该目录下的单独文件")
+    args = parser.parse_args()
+    configure_logging(logging.DEBUG if args.verbose else logging.INFO, trace_dir=args.trace_dir)
+
+    fingerprints = FingerprintIndex(args.fingerprints) if args.fingerprints else None
+    service = XPathService(max_workers=args.workers, js_workers=args.js_workers, cache_ttl=args.cache_ttl,
+                           fingerprints=fingerprints)
+    server = start_service(service, port=args.port, host=args.host, unix_socket=args.unix_socket)
+    # 常驻服务启动时就把浏览器池预热好，第一个请求不必等待Chrome启动
+    driver_pool.start()
+    logger.info("XPath服务已启动: %s", args.unix_socket or f'http://{args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+        if fingerprints is not None:
+            fingerprints.close()
+        driver_pool.close_all()